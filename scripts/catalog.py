@@ -0,0 +1,81 @@
+import threading
+
+from sqlalchemy import text
+
+
+# --------------------------------------------------
+# Schema metadata cache
+# --------------------------------------------------
+# Column lists, types and primary keys for every table in these schemas are
+# read with a single catalog query the first time they are needed and then
+# served from memory for the rest of the run.
+SCHEMAS = ("staging", "production", "warehouse")
+
+CATALOG_QUERY = text("""
+    SELECT
+        n.nspname AS table_schema,
+        c.relname AS table_name,
+        a.attname AS column_name,
+        format_type(a.atttypid, a.atttypmod) AS data_type,
+        COALESCE(a.attnum = ANY(i.indkey), FALSE) AS is_primary_key
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_index i ON i.indrelid = c.oid AND i.indisprimary
+    WHERE n.nspname = ANY(:schemas)
+      AND c.relkind IN ('r', 'p', 'v', 'm')
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+    ORDER BY n.nspname, c.relname, a.attnum
+""")
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def load_catalog(conn):
+    """Reads every table of SCHEMAS in one round trip."""
+    catalog = {}
+    for row in conn.execute(CATALOG_QUERY, {"schemas": list(SCHEMAS)}):
+        table = catalog.setdefault(
+            f"{row.table_schema}.{row.table_name}",
+            {"columns": [], "types": {}, "primary_key": []},
+        )
+        table["columns"].append(row.column_name)
+        table["types"][row.column_name] = row.data_type
+        if row.is_primary_key:
+            table["primary_key"].append(row.column_name)
+    return catalog
+
+
+def invalidate():
+    """Drops the cache; call after any DDL so the next lookup re-reads it."""
+    global _catalog
+    with _lock:
+        _catalog = None
+
+
+def table_info(table, conn):
+    """
+    Metadata for 'schema.table'. A table missing from the cache (created
+    since it was loaded) triggers one reload before giving up.
+    """
+    global _catalog
+    with _lock:
+        if _catalog is None or table not in _catalog:
+            _catalog = load_catalog(conn)
+        if table not in _catalog:
+            raise KeyError(f"Unknown table: {table}")
+        return _catalog[table]
+
+
+def get_columns(table, conn):
+    return list(table_info(table, conn)["columns"])
+
+
+def get_column_types(table, conn):
+    return dict(table_info(table, conn)["types"])
+
+
+def get_primary_key(table, conn):
+    return list(table_info(table, conn)["primary_key"])
@@ -1,12 +1,19 @@
-import csv
-import random
+import argparse
 import json
 import os
+import shutil
 import yaml
+import numpy as np
 import pandas as pd
-from faker import Faker
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from faker import Faker, VERSION as FAKER_VERSION
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from scripts import schemas
+
 # ----------------------------
 # Load config
 # ----------------------------
@@ -24,142 +31,822 @@ END_DATE = datetime.strptime(
     config.get("TRANSACTION_END_DATE", "2024-12-31"), "%Y-%m-%d"
 )
 
-faker = Faker()
+GENERATION_CONFIG = config.get("data_generation", {})
+SEED = GENERATION_CONFIG.get("seed")
+NUM_SHARDS = GENERATION_CONFIG.get("shards", 1)
+BATCH_SIZE = GENERATION_CONFIG.get("batch_size", 100000)
+OUTPUT_FORMAT = GENERATION_CONFIG.get("output_format", "csv")
+
+WORKLOAD_PROFILE = GENERATION_CONFIG.get("workload_profile", "uniform")
+WORKLOAD_PROFILES = GENERATION_CONFIG.get("workload_profiles", {})
+ORDER_VALUE_DISTRIBUTION = GENERATION_CONFIG.get("distribution", {}).get("order_value")
+
+POOL_CONFIG = GENERATION_CONFIG.get("value_pools", {})
+POOL_SIZE = POOL_CONFIG.get("size", 10000)
+POOL_SEED = POOL_CONFIG.get("seed", 0)
+POOL_CACHE_DIR = POOL_CONFIG.get("cache_dir", "data/cache")
+
+INCREMENTAL_CONFIG = GENERATION_CONFIG.get("incremental", {})
+INCREMENTAL_MODE = INCREMENTAL_CONFIG.get("enabled", False)
+DAILY_TRANSACTIONS = INCREMENTAL_CONFIG.get("daily_orders", 500)
+CUSTOMER_CHURN_RATE = INCREMENTAL_CONFIG.get("customer_churn_rate", 0.005)
+PRODUCT_CHURN_RATE = INCREMENTAL_CONFIG.get("product_churn_rate", 0.002)
+
+rng = np.random.default_rng()
 
 OUTPUT_DIR = "data/raw"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# ----------------------------
+# Value domains
+# ----------------------------
+AGE_GROUPS = np.array(["18-25", "26-35", "36-45", "46-60", "60+"])
+CATEGORIES = np.array(["Electronics", "Clothing", "Home & Kitchen", "Books", "Sports", "Beauty"])
+PAYMENT_METHODS = np.array(["Credit Card", "Debit Card", "UPI", "Cash on Delivery", "Net Banking"])
+DISCOUNTS = np.array([0, 5, 10, 15])
+MAX_ITEMS_PER_TRANSACTION = 5
+MAX_QUANTITY = 3
+
+# Every possible date / time label is rendered once and then indexed,
+# so no per-row strftime is needed.
+DATE_LABELS = np.datetime_as_string(
+    np.arange(
+        np.datetime64(START_DATE.date()),
+        np.datetime64(END_DATE.date()) + 1,
+    ),
+    unit="D",
+)
+TIME_LABELS = np.array([
+    f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)
+])
+
+CUSTOMER_COLUMNS = [
+    "customer_id", "first_name", "last_name", "email",
+    "phone", "registration_date", "city", "state",
+    "country", "age_group"
+]
+PRODUCT_COLUMNS = [
+    "product_id", "product_name", "category", "sub_category",
+    "price", "cost", "brand", "stock_quantity", "supplier_id"
+]
+TRANSACTION_COLUMNS = [
+    "transaction_id", "customer_id", "transaction_date",
+    "transaction_time", "payment_method",
+    "shipping_address", "total_amount"
+]
+ITEM_COLUMNS = [
+    "item_id", "transaction_id", "product_id",
+    "quantity", "unit_price",
+    "discount_percentage", "line_total"
+]
+
+# Hive partition key of the transaction datasets in Parquet mode
+PARTITION_COLUMN = "transaction_month"
+
+
+# ----------------------------
+# Vectorized helpers
+# ----------------------------
+def format_ids(prefix, start, count, width):
+    """Business keys such as CUST0001 for the contiguous range start..start+count-1."""
+    if count == 0:
+        return np.array([], dtype=str)
+    numbers = np.arange(start, start + count).astype(str)
+    return np.char.add(prefix, np.char.zfill(numbers, width))
+
+
+def draw_index(n, count, rng=rng, p=None):
+    """`count` indices into range(n), uniform or following the weights `p`."""
+    if p is None:
+        return rng.integers(0, n, size=count)
+    return rng.choice(n, size=count, p=p)
+
+
+def random_dates(count, rng=rng, p=None):
+    return DATE_LABELS[draw_index(len(DATE_LABELS), count, rng, p)]
+
+
+def random_times(count, rng=rng):
+    return TIME_LABELS[rng.integers(0, len(TIME_LABELS), size=count)]
+
+
+# ----------------------------
+# Faker value pools
+# ----------------------------
+# Attributes drawn from pools instead of one Faker call per row
+POOL_PROVIDERS = {
+    "first_name": lambda fake: fake.first_name(),
+    "last_name": lambda fake: fake.last_name(),
+    "phone": lambda fake: fake.phone_number(),
+    "city": lambda fake: fake.city(),
+    "state": lambda fake: fake.state(),
+    "country": lambda fake: fake.country(),
+    "address": lambda fake: fake.address().replace("\n", ", "),
+    "word": lambda fake: fake.word().capitalize(),
+    "company": lambda fake: fake.company(),
+}
+
+_value_pools = {}
+
+
+def load_value_pools(seed=POOL_SEED, size=POOL_SIZE, cache_dir=POOL_CACHE_DIR):
+    """
+    Returns {attribute: array of `size` Faker values}.
+    Pools are built once per (seed, size, Faker version), cached on disk
+    as .npz and memoized in-process. The pool seed is independent of the
+    data seed: runs differ in which values they draw, not in the pools.
+    """
+    path = f"{cache_dir}/faker_pools_{FAKER_VERSION}_seed{seed}_n{size}.npz"
+
+    if path in _value_pools:
+        return _value_pools[path]
+
+    if os.path.exists(path):
+        with np.load(path) as data:
+            pools = {name: data[name] for name in POOL_PROVIDERS}
+    else:
+        fake = Faker()
+        fake.seed_instance(seed)
+        pools = {
+            name: np.array([provider(fake) for _ in range(size)])
+            for name, provider in POOL_PROVIDERS.items()
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **pools)
+        os.replace(tmp_path, path)
+
+    _value_pools[path] = pools
+    return pools
+
+
+def sample_pool(pools, name, count, rng=rng):
+    pool = pools[name]
+    return pool[rng.integers(0, len(pool), size=count)]
+
+
+# ----------------------------
+# Workload profiles (skew)
+# ----------------------------
+def stable_uniform(count, salt, first_id=1):
+    """
+    Uniform (0, 1) value per id number first_id..first_id + count - 1
+    (splitmix64 hash). It depends only on the id, so an entity keeps its
+    popularity across runs, shards and appended batches.
+    """
+    offset = np.uint64(salt * 0x9E3779B97F4A7C15 % 2 ** 64)
+    z = np.arange(first_id, first_id + count, dtype=np.uint64) + offset
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return ((z >> np.uint64(11)).astype(np.float64) + 0.5) / 2.0 ** 53
+
+
+def zipf_weights(count, exponent, salt):
+    """Zipfian popularity: the k-th most popular entity gets weight k^-exponent."""
+    rank = np.argsort(np.argsort(stable_uniform(count, salt))) + 1
+    weights = rank.astype(np.float64) ** -exponent
+    return weights / weights.sum()
+
+
+def pareto_weights(count, alpha, salt):
+    """Heavy-tailed purchase frequency: a few customers order very often."""
+    weights = (1 - stable_uniform(count, salt)) ** (-1 / alpha)
+    return weights / weights.sum()
+
+
+def seasonal_weights(date_labels, weekday_weights, holiday_windows, holiday_boost):
+    """Per-date weights: weekday factor (Mon..Sun) times a boost inside holiday windows."""
+    days = np.array(date_labels, dtype="datetime64[D]")
+    weekday = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    weights = np.asarray(weekday_weights, dtype=np.float64)[weekday]
+
+    # Windows are "MM-DD" pairs; a window may wrap around New Year
+    month_day = np.array([label[5:] for label in date_labels])
+    for start, end in holiday_windows:
+        if start <= end:
+            in_window = (month_day >= start) & (month_day <= end)
+        else:
+            in_window = (month_day >= start) | (month_day <= end)
+        weights[in_window] *= holiday_boost
+
+    return weights / weights.sum()
+
+
+def build_workload(num_customers, num_products, profile=WORKLOAD_PROFILE):
+    """
+    Sampling weights for the configured workload profile.
+    Returns None for the uniform profile.
+    """
+    if profile == "uniform":
+        return None
+
+    params = WORKLOAD_PROFILES[profile]
+    order_value = ORDER_VALUE_DISTRIBUTION if params.get("use_order_value_distribution") else None
+    if order_value and order_value.get("type", "normal") != "normal":
+        raise ValueError(f"Unsupported order_value distribution: {order_value['type']}")
+
+    return {
+        "product_p": zipf_weights(num_products, params.get("product_zipf_exponent", 1.1), salt=1),
+        "customer_p": pareto_weights(num_customers, params.get("customer_pareto_alpha", 1.5), salt=2),
+        "date_p": seasonal_weights(
+            DATE_LABELS,
+            params.get("weekday_weights", [1] * 7),
+            params.get("holiday_windows", []),
+            params.get("holiday_boost", 1.0),
+        ),
+        "order_value": order_value,
+        "max_quantity": params.get("max_quantity", 10),
+    }
+
+
+# ----------------------------
+# Customers
+# ----------------------------
+def build_addresses(count, pools=None, first_id=1):
+    """
+    Shipping address per customer number first_id..first_id + count - 1.
+    The pool entry is picked by a stable hash of the customer number, so
+    a customer has the same address in full, sharded and appended runs.
+    """
+    pools = pools or load_value_pools()
+    pool = pools["address"]
+    index = (stable_uniform(count, salt=3, first_id=first_id) * len(pool)).astype(np.int64)
+    return pool[index]
+
+
+def build_customers(count, rng=rng, pools=None, first_id=1):
+    # The shipping address is kept per customer and reused by their orders.
+    pools = pools or load_value_pools()
+    customers = pd.DataFrame({
+        "customer_id": format_ids("CUST", first_id, count, 4),
+        "first_name": sample_pool(pools, "first_name", count, rng),
+        "last_name": sample_pool(pools, "last_name", count, rng),
+        "email": np.char.add(
+            np.char.add("user", np.arange(first_id, first_id + count).astype(str)),
+            "@example.com",
+        ),
+        "phone": sample_pool(pools, "phone", count, rng),
+        "registration_date": random_dates(count, rng),
+        "city": sample_pool(pools, "city", count, rng),
+        "state": sample_pool(pools, "state", count, rng),
+        "country": sample_pool(pools, "country", count, rng),
+        "age_group": rng.choice(AGE_GROUPS, size=count),
+    })
+    return customers, build_addresses(count, pools, first_id)
+
+
+# ----------------------------
+# Products
+# ----------------------------
+def build_products(count, rng=rng, pools=None, first_id=1):
+    pools = pools or load_value_pools()
+    price = np.round(rng.uniform(10, 1000, size=count), 2)
+    return pd.DataFrame({
+        "product_id": format_ids("PROD", first_id, count, 4),
+        "product_name": sample_pool(pools, "word", count, rng),
+        "category": rng.choice(CATEGORIES, size=count),
+        "sub_category": sample_pool(pools, "word", count, rng),
+        "price": price,
+        "cost": np.round(rng.uniform(5, price - 1), 2),
+        "brand": sample_pool(pools, "company", count, rng),
+        "stock_quantity": rng.integers(10, 501, size=count),
+        "supplier_id": format_ids("SUPP", 0, 101, 3)[rng.integers(1, 101, size=count)],
+    })
+
+
+# ----------------------------
+# Transactions & Items
+# ----------------------------
+def draw_items_per_transaction(count, rng=rng):
+    return rng.integers(1, MAX_ITEMS_PER_TRANSACTION + 1, size=count)
+
+
+def build_transactions(first_txn, count, customers, addresses, products,
+                       first_item=1, rng=rng, items_per_txn=None,
+                       transaction_date=None, workload=None):
+    """
+    Draws `count` transactions starting at TXN number `first_txn` together
+    with their line items as whole arrays. All transactions fall on
+    `transaction_date` when given, otherwise dates span the configured range.
+    `workload` (see build_workload) skews customers, products and dates;
+    None samples uniformly.
+    Returns (transactions, items) DataFrames.
+    """
+    workload = workload or {}
+    txn_ids = format_ids("TXN", first_txn, count, 5)
+
+    # One entry per line item pointing back at its transaction
+    if items_per_txn is None:
+        items_per_txn = draw_items_per_transaction(count, rng)
+    txn_index = np.repeat(np.arange(count), items_per_txn)
+    num_items = len(txn_index)
+
+    product_index = draw_index(len(products), num_items, rng, workload.get("product_p"))
+    quantity = rng.integers(1, MAX_QUANTITY + 1, size=num_items)
+    unit_price = products["price"].to_numpy()[product_index]
+    discount = rng.choice(DISCOUNTS, size=num_items)
+
+    order_value = workload.get("order_value")
+    if order_value:
+        # Size quantities so each order lands near a target value drawn
+        # from the configured order-value distribution.
+        target = np.clip(
+            rng.normal(order_value["mean"], order_value["std_dev"], size=count), 1, None
+        )
+        per_line = (target / items_per_txn)[txn_index]
+        quantity = np.clip(
+            np.rint(per_line / unit_price), 1, workload["max_quantity"]
+        ).astype(np.int64)
+
+    line_total = np.round(quantity * unit_price * (1 - discount / 100), 2)
+
+    # Vectorized groupby-sum of line totals per transaction
+    txn_total = np.round(
+        np.bincount(txn_index, weights=line_total, minlength=count), 2
+    )
+
+    customer_index = draw_index(len(customers), count, rng, workload.get("customer_p"))
+
+    transactions = pd.DataFrame({
+        "transaction_id": txn_ids,
+        "customer_id": customers["customer_id"].to_numpy()[customer_index],
+        "transaction_date": (
+            random_dates(count, rng, workload.get("date_p")) if transaction_date is None
+            else np.full(count, transaction_date)
+        ),
+        "transaction_time": random_times(count, rng),
+        "payment_method": rng.choice(PAYMENT_METHODS, size=count),
+        "shipping_address": addresses[customer_index],
+        "total_amount": txn_total,
+    })
+
+    items = pd.DataFrame({
+        "item_id": format_ids("ITEM", first_item, num_items, 5),
+        "transaction_id": txn_ids[txn_index],
+        "product_id": products["product_id"].to_numpy()[product_index],
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "discount_percentage": discount,
+        "line_total": line_total,
+    })
+
+    return transactions, items
 
-def generate_all_data():
-    # ----------------------------
-    # Customers
-    # ----------------------------
-    customers = []
-
-    for i in range(1, NUM_CUSTOMERS + 1):
-        customers.append([
-            f"CUST{i:04d}",
-            faker.first_name(),
-            faker.last_name(),
-            f"user{i}@example.com",
-            faker.phone_number(),
-            faker.date_between(start_date=START_DATE, end_date=END_DATE).strftime("%Y-%m-%d"),
-            faker.city(),
-            faker.state(),
-            faker.country(),
-            random.choice(["18-25", "26-35", "36-45", "46-60", "60+"]),
-        ])
-
-    with open(f"{OUTPUT_DIR}/customers.csv", "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "customer_id", "first_name", "last_name", "email",
-            "phone", "registration_date", "city", "state",
-            "country", "age_group"
-        ])
-        writer.writerows(customers)
-
-    # ----------------------------
-    # Products
-    # ----------------------------
-    products = []
-    categories = ["Electronics", "Clothing", "Home & Kitchen", "Books", "Sports", "Beauty"]
-
-    for i in range(1, NUM_PRODUCTS + 1):
-        price = round(random.uniform(10, 1000), 2)
-        products.append([
-            f"PROD{i:04d}",
-            faker.word().capitalize(),
-            random.choice(categories),
-            faker.word().capitalize(),
-            price,
-            round(random.uniform(5, price - 1), 2),
-            faker.company(),
-            random.randint(10, 500),
-            f"SUPP{random.randint(1,100):03d}",
-        ])
-
-    with open(f"{OUTPUT_DIR}/products.csv", "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "product_id", "product_name", "category", "sub_category",
-            "price", "cost", "brand", "stock_quantity", "supplier_id"
-        ])
-        writer.writerows(products)
-
-    # ----------------------------
-    # Transactions & Items
-    # ----------------------------
-    transactions = []
-    items = []
-
-    for i in range(1, NUM_TRANSACTIONS + 1):
-        txn_id = f"TXN{i:05d}"
-        customer_id = random.choice(customers)[0]
-
-        txn_total = 0.0
-
-        for _ in range(random.randint(1, 5)):
-            product = random.choice(products)
-            quantity = random.randint(1, 3)
-            unit_price = float(product[4])
-            discount = random.choice([0, 5, 10, 15])
-
-            raw_value = quantity * unit_price * (1 - discount / 100)
-
-            # ✅ CRITICAL FIX — pandas rounding
-            line_total = float(pd.Series([raw_value]).round(2).iloc[0])
-
-            txn_total += line_total
-
-            items.append([
-                f"ITEM{len(items)+1:05d}",
-                txn_id,
-                product[0],
-                quantity,
-                unit_price,
-                discount,
-                line_total,
-            ])
-
-        transactions.append([
-            txn_id,
-            customer_id,
-            faker.date_between(start_date=START_DATE, end_date=END_DATE).strftime("%Y-%m-%d"),
-            faker.time(),
-            random.choice(["Credit Card", "Debit Card", "UPI", "Cash on Delivery", "Net Banking"]),
-            faker.address().replace("\n", ", "),
-            float(pd.Series([txn_total]).round(2).iloc[0]),
-        ])
-
-    with open(f"{OUTPUT_DIR}/transactions.csv", "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "transaction_id", "customer_id", "transaction_date",
-            "transaction_time", "payment_method",
-            "shipping_address", "total_amount"
-        ])
-        writer.writerows(transactions)
-
-    with open(f"{OUTPUT_DIR}/transaction_items.csv", "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "item_id", "transaction_id", "product_id",
-            "quantity", "unit_price",
-            "discount_percentage", "line_total"
-        ])
-        writer.writerows(items)
-
-    with open(f"{OUTPUT_DIR}/generation_metadata.json", "w") as f:
+
+# ----------------------------
+# Streaming writers
+# ----------------------------
+def batch_sizes(count, batch_size):
+    """Sizes of the consecutive batches that cover `count` transactions."""
+    for start in range(0, count, batch_size):
+        yield min(batch_size, count - start)
+
+
+def iter_transaction_batches(first_txn, count, customers, addresses, products,
+                             batch_size=BATCH_SIZE, first_item=1, rng=rng,
+                             counts_rng=None, transaction_date=None, workload=None):
+    """
+    Yields (transactions, items) DataFrames holding at most `batch_size`
+    transactions, so only one batch is ever materialized.
+    """
+    next_txn = first_txn
+    for size in batch_sizes(count, batch_size):
+        items_per_txn = (
+            draw_items_per_transaction(size, counts_rng)
+            if counts_rng is not None else None
+        )
+        transactions, items = build_transactions(
+            next_txn, size, customers, addresses, products,
+            first_item=first_item, rng=rng, items_per_txn=items_per_txn,
+            transaction_date=transaction_date, workload=workload,
+        )
+        next_txn += size
+        first_item += len(items)
+        yield transactions, items
+
+
+def write_csv(df, name, output_dir=OUTPUT_DIR):
+    df.to_csv(f"{output_dir}/{name}.csv", index=False, lineterminator="\n")
+
+
+def stream_csv(batches, transactions_path, items_path):
+    """
+    Appends every (transactions, items) batch to the two CSV files as soon
+    as it is produced. Returns the (transactions, items) row counts.
+    """
+    num_transactions = num_items = 0
+
+    with open(transactions_path, "w", newline="") as txn_file, \
+            open(items_path, "w", newline="") as item_file:
+        txn_file.write(",".join(TRANSACTION_COLUMNS) + "\n")
+        item_file.write(",".join(ITEM_COLUMNS) + "\n")
+
+        for transactions, items in batches:
+            transactions.to_csv(txn_file, header=False, index=False, lineterminator="\n")
+            items.to_csv(item_file, header=False, index=False, lineterminator="\n")
+            num_transactions += len(transactions)
+            num_items += len(items)
+
+    return num_transactions, num_items
+
+
+def to_arrow(df, date_columns=(), time_columns=()):
+    """pandas -> Arrow with proper date32 / time32 types for ISO string columns."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for col in date_columns:
+        table = table.set_column(
+            table.schema.get_field_index(col), col, table[col].cast(pa.date32())
+        )
+    for col in time_columns:
+        parsed = pc.strptime(table[col], format="%H:%M:%S", unit="s")
+        table = table.set_column(
+            table.schema.get_field_index(col), col, parsed.cast(pa.time32("s"))
+        )
+    # The embedded pandas metadata still describes the string columns
+    return table.replace_schema_metadata(None)
+
+
+def write_parquet(df, name, output_dir=OUTPUT_DIR, date_columns=()):
+    pq.write_table(to_arrow(df, date_columns), f"{output_dir}/{name}.parquet")
+
+
+def stream_parquet(batches, output_dir, part_prefix="part-00000"):
+    """
+    Parquet counterpart of stream_csv: every batch is appended to the
+    `transactions` and `transaction_items` datasets, Hive-partitioned by
+    transaction month (e.g. transactions/transaction_month=2024-03/).
+    """
+    num_transactions = num_items = 0
+
+    for batch_no, (transactions, items) in enumerate(batches):
+        month = transactions["transaction_date"].str.slice(0, 7)
+        month_by_txn = pd.Series(month.to_numpy(), index=transactions["transaction_id"])
+
+        transactions = transactions.assign(**{PARTITION_COLUMN: month})
+        items = items.assign(**{PARTITION_COLUMN: items["transaction_id"].map(month_by_txn)})
+
+        for name, table in (
+            ("transactions", to_arrow(transactions, ["transaction_date"], ["transaction_time"])),
+            ("transaction_items", to_arrow(items)),
+        ):
+            pq.write_to_dataset(
+                table,
+                f"{output_dir}/{name}",
+                partition_cols=[PARTITION_COLUMN],
+                basename_template=f"{part_prefix}-{batch_no:05d}-{{i}}.parquet",
+            )
+
+        num_transactions += len(transactions)
+        num_items += len(items)
+
+    return num_transactions, num_items
+
+
+def write_dimensions(customers, products, output_format, output_dir):
+    if output_format == "parquet":
+        write_parquet(customers, "customers", output_dir, ["registration_date"])
+        write_parquet(products, "products", output_dir)
+        # Datasets are appended to part by part, so clear the previous run first
+        for name in ("transactions", "transaction_items"):
+            shutil.rmtree(f"{output_dir}/{name}", ignore_errors=True)
+    else:
+        write_csv(customers, "customers", output_dir)
+        write_csv(products, "products", output_dir)
+
+
+def write_metadata(num_customers, num_products, num_transactions, num_items,
+                   output_dir=OUTPUT_DIR, first_date=START_DATE.strftime("%Y-%m-%d"),
+                   last_date=END_DATE.strftime("%Y-%m-%d"), **extra):
+    """
+    Counts are cumulative and ids are contiguous from 1, so the counts are
+    also the last id numbers an incremental run continues from.
+    """
+    with open(f"{output_dir}/generation_metadata.json", "w") as f:
         json.dump({
             "generated_at": datetime.now().isoformat(),
-            "num_customers": len(customers),
-            "num_products": len(products),
-            "num_transactions": len(transactions),
-            "num_transaction_items": len(items),
+            "num_customers": num_customers,
+            "num_products": num_products,
+            "num_transactions": num_transactions,
+            "num_transaction_items": num_items,
+            "transaction_date_range": [first_date, last_date],
+            "last_customer_id": f"CUST{num_customers:04d}",
+            "last_product_id": f"PROD{num_products:04d}",
+            "last_transaction_id": f"TXN{num_transactions:05d}",
+            "last_item_id": f"ITEM{num_items:05d}",
+            "value_pools": {"seed": POOL_SEED, "size": POOL_SIZE},
+            **extra,
         }, f, indent=4)
 
 
+def read_metadata(output_dir=OUTPUT_DIR):
+    with open(f"{output_dir}/generation_metadata.json") as f:
+        return json.load(f)
+
+
+def generate_all_data(output_dir=OUTPUT_DIR, seed=None, batch_size=BATCH_SIZE,
+                      output_format=OUTPUT_FORMAT, profile=WORKLOAD_PROFILE):
+    os.makedirs(output_dir, exist_ok=True)
+
+    gen_rng = rng if seed is None else np.random.default_rng(seed)
+    pools = load_value_pools()
+
+    customers, addresses = build_customers(NUM_CUSTOMERS, gen_rng, pools)
+    products = build_products(NUM_PRODUCTS, gen_rng, pools)
+    write_dimensions(customers, products, output_format, output_dir)
+
+    batches = iter_transaction_batches(
+        1, NUM_TRANSACTIONS, customers, addresses, products,
+        batch_size=batch_size, rng=gen_rng,
+        workload=build_workload(len(customers), len(products), profile),
+    )
+    if output_format == "parquet":
+        num_transactions, num_items = stream_parquet(batches, output_dir)
+    else:
+        num_transactions, num_items = stream_csv(
+            batches,
+            f"{output_dir}/transactions.csv",
+            f"{output_dir}/transaction_items.csv",
+        )
+
+    write_metadata(
+        len(customers), len(products), num_transactions, num_items, output_dir,
+        seed=seed, batch_size=batch_size, output_format=output_format,
+        workload_profile=profile,
+    )
+
+
+# ----------------------------
+# Incremental (daily) generation
+# ----------------------------
+def read_existing_dimensions(output_format, output_dir):
+    if output_format == "parquet":
+        customers = pd.read_parquet(f"{output_dir}/customers.parquet", columns=["customer_id"])
+        products = pd.read_parquet(f"{output_dir}/products.parquet", columns=["product_id", "price"])
+    else:
+        customers = schemas.read_csv(f"{output_dir}/customers.csv", "customers", usecols=["customer_id"])
+        products = schemas.read_csv(f"{output_dir}/products.csv", "products", usecols=["product_id", "price"])
+    return customers, products
+
+
+def append_dimension(df, name, output_format, output_dir, date_columns=()):
+    if df.empty:
+        return
+    if output_format == "parquet":
+        existing = pd.read_parquet(f"{output_dir}/{name}.parquet")
+        existing[list(date_columns)] = existing[list(date_columns)].astype(str)
+        write_parquet(pd.concat([existing, df], ignore_index=True), name, output_dir, date_columns)
+    else:
+        df.to_csv(f"{output_dir}/{name}.csv", mode="a", header=False, index=False, lineterminator="\n")
+
+
+def generate_incremental_data(output_dir=OUTPUT_DIR, batch_date=None,
+                              num_transactions=DAILY_TRANSACTIONS, seed=None,
+                              batch_size=BATCH_SIZE, profile=WORKLOAD_PROFILE):
+    """
+    Appends one day of orders to an existing dataset.
+
+    Id sequences continue from generation_metadata.json. customers/products
+    files stay full snapshots, with a small churn of new rows appended, and
+    the transaction files hold only the new day's batch.
+    """
+    metadata = read_metadata(output_dir)
+    output_format = metadata.get("output_format", "csv")
+    first_date, last_date = metadata["transaction_date_range"]
+
+    if batch_date is None:
+        batch_date = (pd.Timestamp(last_date) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+
+    gen_rng = rng if seed is None else np.random.default_rng(seed)
+    pools = load_value_pools()
+
+    customers, products = read_existing_dimensions(output_format, output_dir)
+    last_customer = metadata["num_customers"]
+    last_product = metadata["num_products"]
+
+    # Churn: a few brand-new customers and products every day
+    new_customers, _ = build_customers(
+        int(gen_rng.binomial(last_customer, CUSTOMER_CHURN_RATE)),
+        gen_rng, pools, first_id=last_customer + 1,
+    )
+    new_customers["registration_date"] = batch_date
+    new_products = build_products(
+        int(gen_rng.binomial(last_product, PRODUCT_CHURN_RATE)),
+        gen_rng, pools, first_id=last_product + 1,
+    )
+    append_dimension(new_customers, "customers", output_format, output_dir, ["registration_date"])
+    append_dimension(new_products, "products", output_format, output_dir)
+
+    customers = pd.concat([customers, new_customers[["customer_id"]]], ignore_index=True)
+    addresses = build_addresses(len(customers), pools)
+    products = pd.concat([products, new_products[["product_id", "price"]]], ignore_index=True)
+
+    batches = iter_transaction_batches(
+        metadata["num_transactions"] + 1, num_transactions,
+        customers, addresses, products,
+        batch_size=batch_size,
+        first_item=metadata["num_transaction_items"] + 1,
+        rng=gen_rng,
+        transaction_date=batch_date,
+        workload=build_workload(len(customers), len(products), profile),
+    )
+    if output_format == "parquet":
+        for name in ("transactions", "transaction_items"):
+            shutil.rmtree(f"{output_dir}/{name}", ignore_errors=True)
+        batch_transactions, batch_items = stream_parquet(
+            batches, output_dir, part_prefix=f"part-{batch_date}"
+        )
+    else:
+        batch_transactions, batch_items = stream_csv(
+            batches,
+            f"{output_dir}/transactions.csv",
+            f"{output_dir}/transaction_items.csv",
+        )
+
+    write_metadata(
+        len(customers),
+        len(products),
+        metadata["num_transactions"] + batch_transactions,
+        metadata["num_transaction_items"] + batch_items,
+        output_dir,
+        first_date=first_date,
+        last_date=batch_date,
+        seed=seed,
+        batch_size=batch_size,
+        output_format=output_format,
+        workload_profile=profile,
+        mode="incremental",
+        batch={
+            "transaction_date": batch_date,
+            "num_transactions": batch_transactions,
+            "num_transaction_items": batch_items,
+            "new_customers": len(new_customers),
+            "new_products": len(new_products),
+        },
+    )
+
+
+# ----------------------------
+# Sharded generation
+# ----------------------------
+def shard_seed(entropy, shard, stream):
+    """
+    Deterministic SeedSequence for one (shard, stream) pair.
+    Shard 0 is reserved for customers/products, stream 0 of every
+    transaction shard only draws the item counts per transaction.
+    """
+    return np.random.SeedSequence(entropy, spawn_key=(shard, stream))
+
+
+def part_path(name, shard, output_dir):
+    return f"{output_dir}/parts/{name}/part-{shard:05d}.csv"
+
+
+def generate_shard(shard, first_txn, count, first_item, entropy,
+                   customers, addresses, products, output_dir, batch_size,
+                   output_format, workload):
+    """Worker: streams one contiguous TXN range into its part files."""
+    batches = iter_transaction_batches(
+        first_txn, count, customers, addresses, products,
+        batch_size=batch_size,
+        first_item=first_item,
+        rng=np.random.default_rng(shard_seed(entropy, shard + 1, 1)),
+        counts_rng=np.random.default_rng(shard_seed(entropy, shard + 1, 0)),
+        workload=workload,
+    )
+
+    if output_format == "parquet":
+        # Parquet parts land directly in the partitioned datasets
+        num_transactions, num_items = stream_parquet(
+            batches, output_dir, part_prefix=f"part-{shard:05d}"
+        )
+    else:
+        for name in ("transactions", "transaction_items"):
+            os.makedirs(os.path.dirname(part_path(name, shard, output_dir)), exist_ok=True)
+
+        num_transactions, num_items = stream_csv(
+            batches,
+            part_path("transactions", shard, output_dir),
+            part_path("transaction_items", shard, output_dir),
+        )
+
+    return {
+        "shard": shard,
+        "first_transaction_number": first_txn,
+        "num_transactions": num_transactions,
+        "first_item_number": first_item,
+        "num_transaction_items": num_items,
+    }
+
+
+def merge_parts(name, num_shards, output_dir):
+    """Concatenates part files in shard order into {name}.csv with a single header."""
+    with open(f"{output_dir}/{name}.csv", "wb") as out:
+        for shard in range(num_shards):
+            with open(part_path(name, shard, output_dir), "rb") as part:
+                header = part.readline()
+                if shard == 0:
+                    out.write(header)
+                shutil.copyfileobj(part, out, 16 * 1024 * 1024)
+
+
+def generate_sharded_data(num_shards, seed=None, output_dir=OUTPUT_DIR,
+                          workers=None, keep_parts=False, batch_size=BATCH_SIZE,
+                          output_format=OUTPUT_FORMAT, profile=WORKLOAD_PROFILE):
+    """
+    Splits the TXN id space into `num_shards` contiguous ranges generated
+    by a process pool. Each shard draws from its own SeedSequence, so the
+    same seed and shard count always produce byte-identical data files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Without an explicit seed, record the drawn entropy so the run can be replayed
+    entropy = np.random.SeedSequence(seed).entropy
+
+    gen_rng = np.random.default_rng(shard_seed(entropy, 0, 0))
+    pools = load_value_pools()
+    customers, addresses = build_customers(NUM_CUSTOMERS, gen_rng, pools)
+    products = build_products(NUM_PRODUCTS, gen_rng, pools)
+    write_dimensions(customers, products, output_format, output_dir)
+    workload = build_workload(len(customers), len(products), profile)
+
+    # Item ids must be globally contiguous, so the item count of every
+    # earlier shard is replayed up front from its dedicated counts stream,
+    # batch by batch exactly as the worker will draw it.
+    bounds = np.linspace(0, NUM_TRANSACTIONS, num_shards + 1).astype(int)
+    tasks = []
+    first_item = 1
+    for shard in range(num_shards):
+        count = int(bounds[shard + 1] - bounds[shard])
+        tasks.append((shard, int(bounds[shard]) + 1, count, first_item))
+        counts_rng = np.random.default_rng(shard_seed(entropy, shard + 1, 0))
+        first_item += sum(
+            int(draw_items_per_transaction(size, counts_rng).sum())
+            for size in batch_sizes(count, batch_size)
+        )
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                generate_shard, shard, first_txn, count, shard_first_item,
+                entropy, customers, addresses, products, output_dir, batch_size,
+                output_format, workload,
+            )
+            for shard, first_txn, count, shard_first_item in tasks
+        ]
+        shards = [f.result() for f in futures]
+
+    if output_format == "csv" and not keep_parts:
+        merge_parts("transactions", num_shards, output_dir)
+        merge_parts("transaction_items", num_shards, output_dir)
+        shutil.rmtree(f"{output_dir}/parts")
+
+    write_metadata(
+        len(customers),
+        len(products),
+        sum(s["num_transactions"] for s in shards),
+        sum(s["num_transaction_items"] for s in shards),
+        output_dir,
+        seed=seed,
+        entropy=str(entropy),
+        num_shards=num_shards,
+        batch_size=batch_size,
+        output_format=output_format,
+        workload_profile=profile,
+        shards=shards,
+    )
+
+
 if __name__ == "__main__":
-    generate_all_data()
+    parser = argparse.ArgumentParser(description="Generate raw e-commerce data")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--shards", type=int, default=NUM_SHARDS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--keep-parts", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--format", choices=["csv", "parquet"], default=OUTPUT_FORMAT)
+    parser.add_argument("--profile", choices=["uniform", *WORKLOAD_PROFILES], default=WORKLOAD_PROFILE)
+    parser.add_argument("--append", action="store_true", default=INCREMENTAL_MODE,
+                        help="add one day of orders to the existing data")
+    parser.add_argument("--date", default=None,
+                        help="batch date for --append (default: day after the last batch)")
+    args = parser.parse_args()
+
+    if args.append:
+        generate_incremental_data(
+            batch_date=args.date, seed=args.seed, batch_size=args.batch_size,
+            profile=args.profile,
+        )
+    elif args.shards > 1:
+        generate_sharded_data(
+            args.shards, seed=args.seed, workers=args.workers,
+            keep_parts=args.keep_parts, batch_size=args.batch_size,
+            output_format=args.format, profile=args.profile,
+        )
+    else:
+        generate_all_data(
+            seed=args.seed, batch_size=args.batch_size, output_format=args.format,
+            profile=args.profile,
+        )
     print("✅ Raw data generation completed successfully")
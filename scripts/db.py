@@ -0,0 +1,123 @@
+import io
+import os
+import re
+from pathlib import Path
+
+import yaml
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL
+
+load_dotenv()
+
+
+# --------------------------------------------------
+# Database configuration
+# --------------------------------------------------
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "config" / "config.yaml"
+
+DEFAULT_PORT = 5432
+
+_ENV_PATTERN = re.compile(r"\$\{(\w+)\}")
+
+# One pooled engine per application_name, shared by everything in the process
+_engines = {}
+
+
+def expand_env(value):
+    """Replaces ${VAR} with the environment value; unset variables give None."""
+    if not isinstance(value, str):
+        return value
+
+    missing = False
+
+    def lookup(match):
+        nonlocal missing
+        env = os.getenv(match.group(1))
+        if env is None:
+            missing = True
+            return ""
+        return env
+
+    expanded = _ENV_PATTERN.sub(lookup, value)
+    return None if missing and not expanded else expanded
+
+
+def load_database_config(path=CONFIG_PATH):
+    with open(path) as f:
+        config = yaml.safe_load(f).get("database", {})
+    return {key: expand_env(value) for key, value in config.items()}
+
+
+def build_url(config):
+    return URL.create(
+        drivername="postgresql+psycopg2",
+        username=config.get("user"),
+        password=config.get("password"),
+        host=config.get("host"),
+        port=int(config.get("port") or DEFAULT_PORT),
+        database=config.get("name"),
+    )
+
+
+# --------------------------------------------------
+# Engine factory
+# --------------------------------------------------
+def get_engine(application_name="ecommerce_pipeline"):
+    """
+    Returns the pooled engine for `application_name`, creating it on first
+    use. Pool size, overflow, pre-ping, recycling and the per-statement
+    timeout come from the `database` block of config/config.yaml; the
+    application_name shows up in pg_stat_activity so each stage's
+    connections can be told apart.
+    """
+    if application_name in _engines:
+        return _engines[application_name]
+
+    config = load_database_config()
+
+    connect_args = {
+        "application_name": application_name,
+        "connect_timeout": int(config.get("connect_timeout", 10)),
+    }
+    if config.get("statement_timeout_ms"):
+        connect_args["options"] = f"-c statement_timeout={int(config['statement_timeout_ms'])}"
+
+    engine = create_engine(
+        build_url(config),
+        future=True,
+        pool_size=int(config.get("pool_size", 5)),
+        max_overflow=int(config.get("max_overflow", 10)),
+        pool_timeout=int(config.get("pool_timeout", 30)),
+        pool_recycle=int(config.get("pool_recycle", 1800)),
+        pool_pre_ping=bool(config.get("pool_pre_ping", True)),
+        connect_args=connect_args,
+    )
+
+    _engines[application_name] = engine
+    return engine
+
+
+# --------------------------------------------------
+# Bulk load
+# --------------------------------------------------
+def copy_frame(df, table, conn):
+    """
+    Bulk-loads a DataFrame into `table` with COPY ... FROM STDIN through an
+    in-memory CSV buffer. Runs on the raw psycopg2 connection behind
+    `conn`, so it joins the caller's transaction. Returns the rows copied.
+    """
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(df.columns)}) "
+            "FROM STDIN WITH (FORMAT csv, HEADER false)",
+            buffer,
+        )
+        return cursor.rowcount
+    finally:
+        cursor.close()
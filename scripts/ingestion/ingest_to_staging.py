@@ -1,12 +1,20 @@
-import pandas as pd
+import argparse
+import hashlib
+import io
 import json
 import time
 import os
+import yaml
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import URL
-from dotenv import load_dotenv
-load_dotenv()
+from sqlalchemy import text
+from pathlib import Path
+
+from scripts import catalog
+from scripts.db import get_engine
 
 
 # --------------------------------------------------
@@ -15,22 +23,14 @@ load_dotenv()
 DATA_PATH = "data/raw"
 REPORT_PATH = "data/staging"
 
+MANIFEST_PATH = f"{REPORT_PATH}/ingestion_manifest.json"
+
 os.makedirs(REPORT_PATH, exist_ok=True)
 
 # --------------------------------------------------
-# Create SQLAlchemy engine SAFELY
-# (Handles special characters like @ in password)
+# Database connection (shared pool, see scripts/db.py)
 # --------------------------------------------------
-db_url = URL.create(
-    drivername="postgresql+psycopg2",
-    username=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASSWORD"),
-    host=os.getenv("DB_HOST"),
-    port=int(os.getenv("DB_PORT", "5433")),
-    database=os.getenv("DB_NAME"),
-)
-
-engine = create_engine(db_url, future=True)
+engine = get_engine("ingest_to_staging")
 
 # --------------------------------------------------
 # Tables to load
@@ -42,62 +42,374 @@ TABLES = {
     "transaction_items": "staging.transaction_items"
 }
 
+# Bytes handed to the server per COPY round trip
+COPY_BLOCK_SIZE = 1024 * 1024
+
 # --------------------------------------------------
-# Ingestion summary
+# Ingestion mode
 # --------------------------------------------------
-start_time = time.time()
+with open("config/config.yaml") as f:
+    INGESTION_CONFIG = yaml.safe_load(f).get("ingestion", {})
 
-summary = {
-    "ingestion_timestamp": datetime.utcnow().isoformat(),
-    "tables_loaded": {}
-}
+# serial: one transaction loads every table in turn
+# parallel: one connection per table into shadow tables, then an atomic swap
+INGESTION_MODE = INGESTION_CONFIG.get("mode", "serial")
+SHADOW_SUFFIX = "__new"
+SWAP_LOCK_TIMEOUT = INGESTION_CONFIG.get("swap_lock_timeout", "10s")
 
 # --------------------------------------------------
-# Atomic ingestion (all-or-nothing)
+# Source format (whatever the generator last wrote)
 # --------------------------------------------------
-with engine.begin() as conn:
-    for file, table in TABLES.items():
-        try:
-            file_path = f"{DATA_PATH}/{file}.csv"
-            df = pd.read_csv(file_path)
-
-            # Idempotent load
-            conn.execute(text(f"TRUNCATE TABLE {table};"))
-
-            # Bulk insert in safe batches
-            df.to_sql(
-                name=table.split(".")[1],
-                con=conn,
-                schema="staging",
-                if_exists="append",
-                index=False,
-                chunksize=100  # 🔥 CRITICAL FIX
+# Parquet datasets are Hive-partitioned by this column
+PARTITION_COLUMN = "transaction_month"
+PARTITIONED_TABLES = {"transactions", "transaction_items"}
+
+try:
+    with open(f"{DATA_PATH}/generation_metadata.json") as f:
+        SOURCE_FORMAT = json.load(f).get("output_format", "csv")
+except FileNotFoundError:
+    SOURCE_FORMAT = "csv"
+
+
+# Rows converted from Arrow to CSV per COPY chunk
+PARQUET_BATCH_ROWS = 50_000
+
+
+def iter_parquet_chunks(dataset, columns):
+    """Renders a Parquet dataset as headerless CSV, one record batch at a time."""
+    options = pacsv.WriteOptions(include_header=False)
+    batches = dataset.to_batches(
+        columns=columns, batch_size=PARQUET_BATCH_ROWS,
+        batch_readahead=1, fragment_readahead=1,
+    )
+    for batch in batches:
+        sink = pa.BufferOutputStream()
+        pacsv.write_csv(batch, sink, options)
+        yield sink.getvalue().to_pybytes()
+
+
+class ChunkStream(io.RawIOBase):
+    """
+    Read-only file object over an iterator of byte chunks, so COPY can pull
+    from a generator. At most one chunk is held in memory at a time.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def open_source(file):
+    """
+    Returns (columns, stream) for one raw table, where `stream` yields
+    headerless CSV. Neither path reads the whole table into memory: CSV
+    files are read in COPY_BLOCK_SIZE blocks straight from disk, Parquet is
+    scanned batch by batch. The partition column of Hive-partitioned
+    datasets has no staging counterpart and is not read.
+    """
+    if SOURCE_FORMAT == "parquet":
+        if file in PARTITIONED_TABLES:
+            dataset = ds.dataset(f"{DATA_PATH}/{file}", format="parquet", partitioning="hive")
+        else:
+            dataset = ds.dataset(f"{DATA_PATH}/{file}.parquet", format="parquet")
+        columns = [c for c in dataset.schema.names if c != PARTITION_COLUMN]
+        return columns, ChunkStream(iter_parquet_chunks(dataset, columns))
+
+    f = open(f"{DATA_PATH}/{file}.csv", "rb")
+    columns = f.readline().decode("utf-8").strip().split(",")
+    return columns, f
+
+
+# --------------------------------------------------
+# Ingestion manifest (skip unchanged sources)
+# --------------------------------------------------
+def source_files(file):
+    """Every file on disk that makes up one raw table, in a stable order."""
+    if SOURCE_FORMAT == "parquet":
+        if file in PARTITIONED_TABLES:
+            root = f"{DATA_PATH}/{file}"
+            return sorted(
+                os.path.join(dirpath, name)
+                for dirpath, _, names in os.walk(root)
+                for name in names
+                if name.endswith(".parquet")
             )
+        return [f"{DATA_PATH}/{file}.parquet"]
 
-            summary["tables_loaded"][table] = {
-                "rows_loaded": len(df),
-                "status": "success"
-            }
+    return [f"{DATA_PATH}/{file}.csv"]
 
-            print(f"✅ Loaded {table} ({len(df)} rows)")
 
-        except Exception as e:
-            summary["tables_loaded"][table] = {
-                "rows_loaded": 0,
-                "status": "failed",
-                "error_message": str(e)
-            }
-            raise  # rollback entire transaction
+def fingerprint(file):
+    """SHA-256 over the relative path and content of each source file."""
+    digest = hashlib.sha256()
+    size = 0
+    for path in source_files(file):
+        digest.update(os.path.relpath(path, DATA_PATH).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(COPY_BLOCK_SIZE), b""):
+                digest.update(block)
+                size += len(block)
+
+    return {
+        "source_format": SOURCE_FORMAT,
+        "sha256": digest.hexdigest(),
+        "size_bytes": size,
+    }
+
+
+def read_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_manifest(manifest):
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def is_unchanged(conn, table, source, entry):
+    """
+    A source can be skipped when its fingerprint matches the manifest and
+    the staging table still holds exactly the rows loaded from it (so a
+    table emptied or reloaded out of band is picked up again).
+    """
+    if not entry:
+        return False
+    if any(entry.get(k) != v for k, v in source.items()):
+        return False
+
+    rows = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+    return rows == entry.get("row_count")
+
 
 # --------------------------------------------------
-# Final execution time
+# COPY loader
 # --------------------------------------------------
-summary["total_execution_time_seconds"] = round(time.time() - start_time, 2)
+def copy_into(conn, table, columns, stream):
+    """
+    Streams CSV rows (no header) into `table` with COPY ... FROM STDIN.
+    Runs on the raw psycopg2 connection behind `conn`, so it joins the
+    caller's transaction. Returns the number of rows copied.
+    """
+    sql = (
+        f"COPY {table} ({', '.join(columns)}) "
+        "FROM STDIN WITH (FORMAT csv, HEADER false)"
+    )
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(sql, stream, size=COPY_BLOCK_SIZE)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def load_table(conn, file, table):
+    """Pipes one raw table into `table`; memory use is independent of file size."""
+    columns, stream = open_source(file)
+    with stream:
+        return copy_into(conn, table, columns, stream)
+
+
+def timed_load(conn, file, table):
+    """Loads one file and returns its summary entry."""
+    table_start = time.time()
+    rows = load_table(conn, file, table)
+    elapsed = time.time() - table_start
+
+    print(f"✅ Loaded {table} ({rows} rows, {rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    return {
+        "rows_loaded": rows,
+        "status": "success",
+        "load_time_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed) if elapsed > 0 else None,
+    }
+
+
+def failed_entry(error):
+    return {
+        "rows_loaded": 0,
+        "status": "failed",
+        "error_message": str(error)
+    }
+
+
+def skipped_entry(entry):
+    return {
+        "rows_loaded": 0,
+        "status": "skipped_unchanged",
+        "row_count": entry["row_count"],
+        "sha256": entry["sha256"],
+    }
+
+
+# --------------------------------------------------
+# Serial mode: atomic ingestion (all-or-nothing)
+# --------------------------------------------------
+def ingest_serial(summary, tables):
+    with engine.begin() as conn:
+        for file, table in tables.items():
+            try:
+                # Idempotent load
+                conn.execute(text(f"TRUNCATE TABLE {table};"))
+                summary["tables_loaded"][table] = timed_load(conn, file, table)
+
+            except Exception as e:
+                summary["tables_loaded"][table] = failed_entry(e)
+                raise  # rollback entire transaction
+
+
+# --------------------------------------------------
+# Parallel mode: shadow tables + atomic swap
+# --------------------------------------------------
+def load_shadow(file, table):
+    """
+    Loads `file` into a fresh copy of `table` (staging.x__new) on its own
+    pooled connection and commits. The live table is not touched.
+    """
+    shadow = f"{table}{SHADOW_SUFFIX}"
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {shadow}"))
+        conn.execute(text(f"CREATE TABLE {shadow} (LIKE {table} INCLUDING ALL)"))
+        return timed_load(conn, file, shadow)
+
+
+def swap_shadow_tables(tables):
+    """Renames every shadow table into place in one short transaction."""
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+        for table in tables:
+            schema, name = table.split(".")
+            conn.execute(text(f"ALTER TABLE {table} RENAME TO {name}__old"))
+            conn.execute(text(f"ALTER TABLE {table}{SHADOW_SUFFIX} RENAME TO {name}"))
+            conn.execute(text(f"DROP TABLE {schema}.{name}__old"))
+
+    catalog.invalidate()
+
+
+def drop_shadow_tables(tables):
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}{SHADOW_SUFFIX}"))
+
+
+def ingest_parallel(summary, tables):
+    """
+    Every table loads at the same time into its shadow table. Only when all
+    loads succeed are they swapped in, so readers never see a mix of old
+    and new tables and a failure leaves the live tables untouched.
+    """
+    with ThreadPoolExecutor(max_workers=len(tables)) as pool:
+        futures = {
+            table: pool.submit(load_shadow, file, table)
+            for file, table in tables.items()
+        }
+
+    errors = []
+    for table, future in futures.items():
+        try:
+            summary["tables_loaded"][table] = future.result()
+        except Exception as e:
+            summary["tables_loaded"][table] = failed_entry(e)
+            errors.append(e)
+
+    if errors:
+        drop_shadow_tables(tables.values())
+        raise errors[0]
+
+    swap_shadow_tables(tables.values())
+
 
 # --------------------------------------------------
-# Write ingestion report
+# Main
 # --------------------------------------------------
-with open(f"{REPORT_PATH}/ingestion_summary.json", "w") as f:
-    json.dump(summary, f, indent=2)
+def run_ingestion(mode=INGESTION_MODE, force=False):
+    start_time = time.time()
+
+    summary = {
+        "ingestion_timestamp": datetime.utcnow().isoformat(),
+        "source_format": SOURCE_FORMAT,
+        "mode": mode,
+        "tables_loaded": {}
+    }
+
+    # --------------------------------------------------
+    # Only reload sources whose content changed
+    # --------------------------------------------------
+    manifest = read_manifest()
+    sources = {file: fingerprint(file) for file in TABLES}
+    pending = {}
+
+    with engine.connect() as conn:
+        for file, table in TABLES.items():
+            entry = manifest.get(file)
+            if not force and is_unchanged(conn, table, sources[file], entry):
+                summary["tables_loaded"][table] = skipped_entry(entry)
+                print(f"⏭️  Skipped {table} (source unchanged)")
+            else:
+                pending[file] = table
+
+    if pending:
+        if mode == "parallel":
+            ingest_parallel(summary, pending)
+        else:
+            ingest_serial(summary, pending)
+
+    # --------------------------------------------------
+    # Record what is now in staging
+    # --------------------------------------------------
+    for file, table in pending.items():
+        manifest[file] = {
+            **sources[file],
+            "row_count": summary["tables_loaded"][table]["rows_loaded"],
+            "staging_table": table,
+            "loaded_at": summary["ingestion_timestamp"],
+        }
+    write_manifest(manifest)
+
+    # Keep the summary in TABLES order regardless of which tables loaded
+    summary["tables_loaded"] = {
+        table: summary["tables_loaded"][table] for table in TABLES.values()
+    }
+
+    # --------------------------------------------------
+    # Final execution time
+    # --------------------------------------------------
+    summary["total_execution_time_seconds"] = round(time.time() - start_time, 2)
+
+    # --------------------------------------------------
+    # Write ingestion report
+    # --------------------------------------------------
+    with open(f"{REPORT_PATH}/ingestion_summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load raw files into staging")
+    parser.add_argument("--mode", choices=["serial", "parallel"], default=INGESTION_MODE)
+    parser.add_argument("--force", action="store_true",
+                        help="reload every table even if its source is unchanged")
+    args = parser.parse_args()
 
-print("🎉 Data ingestion to staging completed successfully")
+    run_ingestion(mode=args.mode, force=args.force)
+    print("🎉 Data ingestion to staging completed successfully")
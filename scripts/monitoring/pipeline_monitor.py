@@ -3,8 +3,9 @@ import os
 import time
 from datetime import datetime, timezone
 import pandas as pd
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import URL
+from sqlalchemy import text
+
+from scripts.db import get_engine
 
 OUTPUT_PATH = "data/processed"
 os.makedirs(OUTPUT_PATH, exist_ok=True)
@@ -12,15 +13,7 @@ os.makedirs(OUTPUT_PATH, exist_ok=True)
 # -------------------------
 # Database connection
 # -------------------------
-db_url = URL.create(
-    drivername="postgresql+psycopg2",
-    username=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASSWORD"),
-    host=os.getenv("DB_HOST"),
-    port=int(os.getenv("DB_PORT")),
-    database=os.getenv("DB_NAME"),
-)
-engine = create_engine(db_url, future=True)
+engine = get_engine("pipeline_monitor")
 
 ALERTS = []
 
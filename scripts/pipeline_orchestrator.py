@@ -39,11 +39,14 @@ error_logger.addHandler(error_handler)
 # --------------------------------------------------
 # Pipeline Steps (STRICT ORDER)
 # --------------------------------------------------
+# Each step runs as `python -m <module>` from the repo root, so steps can
+# import the shared scripts.* modules
 PIPELINE_STEPS = [
-    ("data_generation", "scripts/data_generation/generate_data.py"),
-    ("data_quality_checks", "scripts/quality_checks/validate_data.py"),
-    ("warehouse_load", "scripts/transformation/load_warehouse.py"),
-    ("analytics_generation", "scripts/transformation/generate_analytics.py"),
+    ("data_generation", "scripts.data_generation.generate_data"),
+    ("data_quality_checks", "scripts.quality_checks.validate_data"),
+    ("warehouse_load", "scripts.transformation.load_warehouse"),
+    ("view_refresh", "scripts.transformation.refresh_views"),
+    ("analytics_generation", "scripts.transformation.generate_analytics"),
 ]
 
 # --------------------------------------------------
@@ -55,7 +58,7 @@ BACKOFF_SECONDS = [1, 2, 4]
 # --------------------------------------------------
 # Execute Step with Retry
 # --------------------------------------------------
-def execute_step(step_name, script_path):
+def execute_step(step_name, module):
     start = time.time()
     retries = 0
 
@@ -64,7 +67,7 @@ def execute_step(step_name, script_path):
             logging.info(f"Starting step: {step_name} (attempt {retries + 1})")
 
             subprocess.run(
-                ["python", script_path],
+                ["python", "-m", module],
                 check=True,
                 timeout=600
             )
@@ -123,8 +126,8 @@ def run_pipeline():
 
     logging.info(f"Pipeline started: {PIPELINE_ID}")
 
-    for step_name, script in PIPELINE_STEPS:
-        result = execute_step(step_name, script)
+    for step_name, module in PIPELINE_STEPS:
+        result = execute_step(step_name, module)
         steps_report[step_name] = result
 
         if result["status"] != "success":
@@ -1,10 +1,9 @@
 import json
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import URL
-from dotenv import load_dotenv
-load_dotenv()
+from sqlalchemy import text
+
+from scripts.db import get_engine
 
 
 # ==================================================
@@ -13,16 +12,7 @@ load_dotenv()
 OUTPUT_PATH = "data/processed"
 os.makedirs(OUTPUT_PATH, exist_ok=True)
 
-DB_URL = URL.create(
-    drivername="postgresql+psycopg2",
-    username=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASSWORD"),
-    host=os.getenv("DB_HOST"),
-    port=int(os.getenv("DB_PORT")),
-    database=os.getenv("DB_NAME"),
-)
-
-engine = create_engine(DB_URL, future=True)
+engine = get_engine("validate_data")
 
 # ==================================================
 # Utility
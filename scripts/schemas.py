@@ -0,0 +1,132 @@
+import pandas as pd
+
+
+# --------------------------------------------------
+# Column types shared by the raw files, staging and production
+# --------------------------------------------------
+# IDs and free text use Arrow-backed strings (one buffer per column instead
+# of a Python object per cell). Low-cardinality fields are categoricals.
+# Money stays float64: every amount is rounded to cents and float32 cannot
+# hold cents exactly beyond ~100k, while Arrow decimals are not supported
+# by to_sql or most pandas arithmetic.
+ID = "string[pyarrow]"
+TEXT = "string[pyarrow]"
+CATEGORY = "category"
+MONEY = "float64"
+DATE = "date"
+TIMESTAMP = "timestamp"
+
+TABLE_SCHEMAS = {
+    "customers": {
+        "customer_id": ID,
+        "first_name": TEXT,
+        "last_name": TEXT,
+        "email": TEXT,
+        "phone": TEXT,
+        "registration_date": DATE,
+        "city": TEXT,
+        "state": CATEGORY,
+        "country": CATEGORY,
+        "age_group": CATEGORY,
+    },
+    "products": {
+        "product_id": ID,
+        "product_name": TEXT,
+        "category": CATEGORY,
+        "sub_category": CATEGORY,
+        "price": MONEY,
+        "cost": MONEY,
+        "brand": TEXT,
+        "stock_quantity": "Int32",
+        "supplier_id": ID,
+    },
+    "transactions": {
+        "transaction_id": ID,
+        "customer_id": ID,
+        "transaction_date": DATE,
+        "transaction_time": TEXT,
+        "payment_method": CATEGORY,
+        "shipping_address": TEXT,
+        "total_amount": MONEY,
+    },
+    "transaction_items": {
+        "item_id": ID,
+        "transaction_id": ID,
+        "product_id": ID,
+        "quantity": "Int16",
+        "unit_price": MONEY,
+        "discount_percentage": MONEY,
+        "line_total": MONEY,
+    },
+}
+
+# Audit columns present on staging/production tables only
+AUDIT_COLUMNS = {
+    "loaded_at": TIMESTAMP,
+    "created_at": TIMESTAMP,
+    "updated_at": TIMESTAMP,
+}
+
+# Rows fetched per round trip by read_sql
+SQL_CHUNK_ROWS = 100_000
+
+
+def table_schema(table, audit=True):
+    """Column types for a table; accepts 'customers' or 'staging.customers'."""
+    schema = dict(TABLE_SCHEMAS[table.split(".")[-1]])
+    if audit:
+        schema.update(AUDIT_COLUMNS)
+    return schema
+
+
+def split_schema(table, columns=None, audit=True):
+    """Returns (dtype mapping, date columns) restricted to `columns`."""
+    schema = table_schema(table, audit)
+    if columns is not None:
+        schema = {c: t for c, t in schema.items() if c in columns}
+
+    dtypes = {c: t for c, t in schema.items() if t not in (DATE, TIMESTAMP)}
+    dates = [c for c, t in schema.items() if t in (DATE, TIMESTAMP)]
+    return dtypes, dates
+
+
+def apply_schema(df, table, categories=True):
+    """Casts the columns of `df` that the registry knows about."""
+    dtypes, dates = split_schema(table, df.columns)
+    if not categories:
+        dtypes = {c: (TEXT if t == CATEGORY else t) for c, t in dtypes.items()}
+
+    df = df.astype(dtypes)
+    for col in dates:
+        df[col] = pd.to_datetime(df[col])
+    return df
+
+
+# --------------------------------------------------
+# Typed readers
+# --------------------------------------------------
+def read_csv(path, table, usecols=None, **kwargs):
+    """pd.read_csv of a raw file with the registry dtypes applied while parsing."""
+    dtypes, dates = split_schema(table, usecols, audit=False)
+    return pd.read_csv(
+        path, usecols=usecols, dtype=dtypes, parse_dates=dates, **kwargs
+    )
+
+
+def read_sql(sql, conn, table, **kwargs):
+    """
+    pd.read_sql with the registry dtypes. Rows are fetched and cast in
+    chunks so untyped object columns never exist for the whole result;
+    categoricals are built once at the end so every chunk shares the same
+    categories.
+    """
+    chunks = [
+        apply_schema(chunk, table, categories=False)
+        for chunk in pd.read_sql(sql, conn, chunksize=SQL_CHUNK_ROWS, **kwargs)
+    ]
+    if not chunks:
+        return apply_schema(pd.read_sql(sql, conn, **kwargs), table)
+
+    df = pd.concat(chunks, ignore_index=True)
+    dtypes, _ = split_schema(table, df.columns)
+    return df.astype({c: t for c, t in dtypes.items() if t == CATEGORY})
@@ -0,0 +1,118 @@
+from datetime import date
+
+import pandas as pd
+import yaml
+from sqlalchemy import text
+
+from scripts.db import copy_frame
+
+
+# --------------------------------------------------
+# Date dimension
+# --------------------------------------------------
+with open("config/config.yaml") as f:
+    CONFIG = yaml.safe_load(f)
+
+DATE_RANGE = CONFIG.get("data_generation", {}).get("transaction_date_range", {})
+DIM_DATE_CONFIG = CONFIG.get("warehouse", {}).get("dim_date", {})
+
+# 1 = calendar year; otherwise the fiscal year is named after the
+# calendar year it ends in
+FISCAL_YEAR_START_MONTH = DIM_DATE_CONFIG.get("fiscal_year_start_month", 1)
+
+# "MM-DD" -> holiday name, repeated every year
+HOLIDAYS = DIM_DATE_CONFIG.get("holidays") or {}
+
+
+def required_range(conn):
+    """
+    (first, last) date the dimension must cover: the configured
+    transaction date range widened to every transaction date loaded.
+    """
+    first, last = conn.execute(text(
+        "SELECT MIN(transaction_date), MAX(transaction_date) FROM production.transactions"
+    )).one()
+
+    bounds = [d for d in (first, last) if d is not None]
+    for key in ("start_date", "end_date"):
+        if key in DATE_RANGE:
+            bounds.append(date.fromisoformat(str(DATE_RANGE[key])))
+    if not bounds:
+        return None
+    return min(bounds), max(bounds)
+
+
+def date_rows(start, end):
+    """One row per day from start to end with every dim_date attribute."""
+    dates = pd.date_range(start=start, end=end)
+    df = pd.DataFrame({"full_date": dates})
+
+    df["date_key"] = df["full_date"].dt.strftime("%Y%m%d").astype(int)
+    df["year"] = df["full_date"].dt.year
+    df["quarter"] = df["full_date"].dt.quarter
+    df["month"] = df["full_date"].dt.month
+    df["day"] = df["full_date"].dt.day
+    df["month_name"] = df["full_date"].dt.month_name()
+    df["day_name"] = df["full_date"].dt.day_name()
+    df["week_of_year"] = df["full_date"].dt.isocalendar().week.astype(int)
+    df["is_weekend"] = df["day_name"].isin(["Saturday", "Sunday"])
+
+    # Months counted from the fiscal year start: April is fiscal month 1
+    # when the year starts in April
+    offset = (df["month"] - FISCAL_YEAR_START_MONTH) % 12
+    df["fiscal_month"] = offset + 1
+    df["fiscal_quarter"] = offset // 3 + 1
+    df["fiscal_year"] = df["year"]
+    if FISCAL_YEAR_START_MONTH != 1:
+        df.loc[df["month"] >= FISCAL_YEAR_START_MONTH, "fiscal_year"] += 1
+
+    df["holiday_name"] = df["full_date"].dt.strftime("%m-%d").map(HOLIDAYS)
+    df["is_holiday"] = df["holiday_name"].notna()
+
+    df["full_date"] = df["full_date"].dt.date
+    return df
+
+
+def is_complete(start, end, conn):
+    """True when every day of [start, end] is present with all attributes."""
+    return conn.execute(
+        text("""
+            SELECT COUNT(*) = :days AND COUNT(*) = COUNT(fiscal_year)
+            FROM warehouse.dim_date
+            WHERE full_date BETWEEN :start AND :end
+        """),
+        {"days": (end - start).days + 1, "start": start, "end": end},
+    ).scalar()
+
+
+def ensure_dates(conn):
+    """
+    Extends warehouse.dim_date to the required range. A steady-state run
+    is a single count query; otherwise the range is COPYed into a scratch
+    table and only missing dates (or rows written before the fiscal and
+    holiday columns existed) are written. Returns the rows written.
+    """
+    needed = required_range(conn)
+    if needed is None or is_complete(*needed, conn):
+        return 0
+
+    df = date_rows(*needed)
+    conn.execute(text("""
+        CREATE TEMP TABLE dim_date_new
+        (LIKE warehouse.dim_date INCLUDING DEFAULTS) ON COMMIT DROP
+    """))
+    copy_frame(df, "dim_date_new", conn)
+
+    written = conn.execute(text("""
+        INSERT INTO warehouse.dim_date AS d
+        SELECT * FROM dim_date_new
+        ON CONFLICT (date_key) DO UPDATE
+        SET fiscal_year = EXCLUDED.fiscal_year,
+            fiscal_quarter = EXCLUDED.fiscal_quarter,
+            fiscal_month = EXCLUDED.fiscal_month,
+            is_holiday = EXCLUDED.is_holiday,
+            holiday_name = EXCLUDED.holiday_name
+        WHERE d.fiscal_year IS NULL
+    """)).rowcount
+    conn.execute(text("DROP TABLE dim_date_new"))
+    return written
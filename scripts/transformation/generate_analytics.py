@@ -3,8 +3,9 @@ import time
 import json
 import pandas as pd
 from datetime import datetime
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import URL
+from sqlalchemy import text
+
+from scripts.db import get_engine
 
 
 
@@ -26,16 +27,7 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # --------------------------------------------------
 # DB Connection
 # --------------------------------------------------
-db_url = URL.create(
-    drivername="postgresql+psycopg2",
-    username="postgres",
-    password="Dileep@2025",
-    host="localhost",
-    port=5433,
-    database="ecommerce_db",
-)
-
-engine = create_engine(db_url)
+engine = get_engine("generate_analytics")
 
 with engine.connect() as conn:
     result = conn.execute(text("SELECT COUNT(*) FROM production.transaction_items"))
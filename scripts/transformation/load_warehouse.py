@@ -1,51 +1,53 @@
-import pandas as pd
-from datetime import date
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import URL
+import argparse
+import json
 import os
-from dotenv import load_dotenv
-load_dotenv()
+import time
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from sqlalchemy import text
+
+from scripts import catalog
+from scripts.db import get_engine
+from scripts.transformation import date_dimension, partitions, watermarks
 
 
 # --------------------------------------------------
 # Database connection
 # --------------------------------------------------
-db_url = URL.create(
-    drivername="postgresql+psycopg2",
-    username=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASSWORD"),
-    host=os.getenv("DB_HOST"),
-    port=int(os.getenv("DB_PORT")),
-    database=os.getenv("DB_NAME"),
-)
-engine = create_engine(db_url, future=True)
+engine = get_engine("load_warehouse")
+
+with open("config/config.yaml") as f:
+    WAREHOUSE_CONFIG = yaml.safe_load(f).get("warehouse", {})
+
+# incremental | full
+FACT_LOAD = WAREHOUSE_CONFIG.get("fact_load", "incremental")
+
+# Items this far below the watermark are re-checked for late arrivals
+LATE_ARRIVAL_LOOKBACK = WAREHOUSE_CONFIG.get("late_arrival_lookback", 10000)
+
+# parallel: independent builds run concurrently, one transaction each
+# atomic:   every build runs in turn inside a single transaction
+EXECUTION_MODE = WAREHOUSE_CONFIG.get("execution", "parallel")
+
+FACT_TABLE = "warehouse.fact_sales"
+
+REPORT_PATH = "data/processed"
 
 # --------------------------------------------------
 # BUILD DIM DATE
 # --------------------------------------------------
-def build_dim_date(start_date, end_date, conn):
-    dates = pd.date_range(start=start_date, end=end_date)
-    df = pd.DataFrame({"full_date": dates})
-
-    df["date_key"] = df["full_date"].dt.strftime("%Y%m%d").astype(int)
-    df["year"] = df["full_date"].dt.year
-    df["quarter"] = df["full_date"].dt.quarter
-    df["month"] = df["full_date"].dt.month
-    df["day"] = df["full_date"].dt.day
-    df["month_name"] = df["full_date"].dt.month_name()
-    df["day_name"] = df["full_date"].dt.day_name()
-    df["week_of_year"] = df["full_date"].dt.isocalendar().week.astype(int)
-    df["is_weekend"] = df["day_name"].isin(["Saturday", "Sunday"])
-
-    conn.execute(text("TRUNCATE warehouse.dim_date CASCADE"))
-    df.to_sql("dim_date", conn, schema="warehouse", if_exists="append", index=False)
+def build_dim_date(conn):
+    written = date_dimension.ensure_dates(conn)
+    if written:
+        watermarks.mark_loaded("warehouse.dim_date", conn)
+    return written
 
 # --------------------------------------------------
 # BUILD DIM PAYMENT METHOD
 # --------------------------------------------------
 def build_dim_payment_method(conn):
-    conn.execute(text("TRUNCATE warehouse.dim_payment_method CASCADE"))
-
     methods = [
         ("Credit Card", "Online"),
         ("Debit Card", "Online"),
@@ -54,179 +56,524 @@ def build_dim_payment_method(conn):
         ("Cash on Delivery", "Offline"),
     ]
 
-    for name, ptype in methods:
-        conn.execute(
-            text("""
-                INSERT INTO warehouse.dim_payment_method
-                (payment_method_name, payment_type)
-                VALUES (:name, :ptype)
-            """),
-            {"name": name, "ptype": ptype},
+    # One multi-row upsert; rows that already match are left untouched
+    values = ", ".join(f"(:name{i}, :ptype{i})" for i in range(len(methods)))
+    params = {}
+    for i, (name, ptype) in enumerate(methods):
+        params[f"name{i}"] = name
+        params[f"ptype{i}"] = ptype
+
+    return conn.execute(
+        text(f"""
+            INSERT INTO warehouse.dim_payment_method
+            (payment_method_name, payment_type)
+            VALUES {values}
+            ON CONFLICT (payment_method_name) DO UPDATE
+            SET payment_type = EXCLUDED.payment_type
+            WHERE dim_payment_method.payment_type IS DISTINCT FROM EXCLUDED.payment_type
+        """),
+        params,
+    ).rowcount
+
+# --------------------------------------------------
+# SCD TYPE 2 (incremental, attribute hash)
+# --------------------------------------------------
+# Effective date given to the first version of every business key, so
+# facts dated before the dimension was first loaded still find a version
+SCD_FIRST_EFFECTIVE_DATE = "1900-01-01"
+
+
+def scd2_merge(dim, business_key, source_sql, attributes, conn):
+    """
+    Applies production changes to an SCD Type 2 dimension.
+
+    `source_sql` yields one row per business key with the `attributes`
+    columns. Attributes are cast to the dimension's column types and
+    hashed, then compared with attribute_hash of the current version:
+      - unchanged keys are left alone (surrogate key untouched)
+      - changed keys have their current version closed (end_date today)
+        and a new current version inserted
+      - keys gone from production have their current version closed
+      - new keys get a first version effective from 1900-01-01
+    Returns the number of versions inserted, closed and unchanged.
+    """
+    types = catalog.get_column_types(f"warehouse.{dim}", conn)
+    cast = ", ".join(f"CAST({c} AS {types[c]}) AS {c}" for c in attributes)
+    columns = ", ".join(attributes)
+
+    # Versions written before attribute_hash existed: hash them in place.
+    # The old full refresh stamped them with the load day, so a key's
+    # earliest version is backdated like any first version; otherwise
+    # facts older than that load would match no version.
+    conn.execute(text(f"""
+        UPDATE warehouse.{dim} d
+        SET attribute_hash = md5(ROW({', '.join(f'd.{c}' for c in attributes)})::text),
+            effective_date = CASE
+                WHEN EXISTS (
+                    SELECT 1 FROM warehouse.{dim} e
+                    WHERE e.{business_key} = d.{business_key}
+                      AND e.effective_date < d.effective_date
+                ) THEN d.effective_date
+                ELSE DATE '{SCD_FIRST_EFFECTIVE_DATE}'
+            END
+        WHERE attribute_hash IS NULL
+    """))
+
+    changes = f"scd_changes_{dim}"
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {changes} ON COMMIT DROP AS
+        SELECT t.*, md5(ROW({columns})::text) AS attribute_hash
+        FROM (
+            SELECT {business_key}, {cast}
+            FROM ({source_sql}) s
+        ) t
+    """))
+
+    closed = conn.execute(text(f"""
+        UPDATE warehouse.{dim} d
+        SET end_date = CURRENT_DATE,
+            is_current = FALSE
+        WHERE d.is_current
+          AND NOT EXISTS (
+              SELECT 1 FROM {changes} c
+              WHERE c.{business_key} = d.{business_key}
+                AND c.attribute_hash = d.attribute_hash
+          )
+    """)).rowcount
+
+    inserted = conn.execute(text(f"""
+        INSERT INTO warehouse.{dim} (
+            {business_key}, {columns}, attribute_hash,
+            effective_date, end_date, is_current
         )
+        SELECT
+            c.{business_key}, {', '.join(f'c.{a}' for a in attributes)}, c.attribute_hash,
+            CASE
+                WHEN EXISTS (
+                    SELECT 1 FROM warehouse.{dim} h
+                    WHERE h.{business_key} = c.{business_key}
+                ) THEN CURRENT_DATE
+                ELSE DATE '{SCD_FIRST_EFFECTIVE_DATE}'
+            END,
+            NULL,
+            TRUE
+        FROM {changes} c
+        WHERE NOT EXISTS (
+            SELECT 1 FROM warehouse.{dim} d
+            WHERE d.{business_key} = c.{business_key} AND d.is_current
+        )
+    """)).rowcount
+
+    total = conn.execute(text(f"SELECT COUNT(*) FROM {changes}")).scalar()
+    conn.execute(text(f"DROP TABLE {changes}"))
+
+    # Lets the reporting views notice new versions without new facts
+    if inserted or closed:
+        watermarks.mark_loaded(f"warehouse.{dim}", conn)
+
+    return {
+        "inserted": inserted,
+        "closed": closed,
+        "unchanged": total - inserted,
+    }
+
 
 # --------------------------------------------------
-# BUILD DIM CUSTOMERS (SCD TYPE 2 – FULL REFRESH)
+# BUILD DIM CUSTOMERS (SCD TYPE 2)
 # --------------------------------------------------
 def build_dim_customers(conn):
-    customers = pd.read_sql("SELECT * FROM production.customers", conn)
-    conn.execute(text("TRUNCATE warehouse.dim_customers CASCADE"))
-
-    customers["full_name"] = customers["first_name"] + " " + customers["last_name"]
-    customers["effective_date"] = date.today()
-    customers["end_date"] = None
-    customers["is_current"] = True
-
-    customers[[
-        "customer_id", "full_name", "email", "city", "state",
-        "country", "age_group", "registration_date",
-        "effective_date", "end_date", "is_current"
-    ]].to_sql(
+    return scd2_merge(
         "dim_customers",
+        "customer_id",
+        """
+        SELECT
+            customer_id,
+            first_name || ' ' || last_name AS full_name,
+            email, city, state, country, age_group, registration_date
+        FROM production.customers
+        """,
+        ["full_name", "email", "city", "state", "country", "age_group", "registration_date"],
         conn,
-        schema="warehouse",
-        if_exists="append",
-        index=False
     )
 
 # --------------------------------------------------
-# BUILD DIM PRODUCTS (✅ FIXED)
+# BUILD DIM PRODUCTS (SCD TYPE 2)
 # --------------------------------------------------
 def build_dim_products(conn):
-    products = pd.read_sql(
+    # price_range is derived inside the warehouse
+    return scd2_merge(
+        "dim_products",
+        "product_id",
         """
         SELECT
-            product_id,
-            product_name,
-            category,
-            sub_category,
-            brand,
-            price,
-            cost
+            product_id, product_name, category, sub_category, brand,
+            CASE
+                WHEN price < 50 THEN 'Budget'
+                WHEN price < 200 THEN 'Mid-range'
+                ELSE 'Premium'
+            END AS price_range
         FROM production.products
         """,
-        conn
+        ["product_name", "category", "sub_category", "brand", "price_range"],
+        conn,
     )
 
-    # 🔹 Derive price_category INSIDE warehouse
-    def price_bucket(price):
-        if price < 50:
-            return "Budget"
-        elif price < 200:
-            return "Mid-range"
-        return "Premium"
+# --------------------------------------------------
+# BUILD FACT SALES
+# --------------------------------------------------
+def fact_delta_filter(conn):
+    """
+    WHERE clause selecting the line items not yet in fact_sales: IDs past
+    the fact watermark (less the lookback window) that the anti-join on
+    (item_id, date_key) does not find. Both probes are indexed, so the
+    cost follows the day's items rather than the whole history.
+    """
+    since = max(watermarks.get_watermark(FACT_TABLE, conn) - LATE_ARRIVAL_LOOKBACK, 0)
+
+    return f"""
+        {watermarks.id_number("ti.item_id")} > {since}
+        AND NOT EXISTS (
+            SELECT 1 FROM warehouse.fact_sales f
+            WHERE f.item_id = ti.item_id
+              AND f.date_key = dd.date_key
+        )
+    """
 
-    products["price_category"] = products["price"].apply(price_bucket)
 
-    products["effective_date"] = date.today()
-    products["end_date"] = None
-    products["is_current"] = True
+def build_fact_sales(conn, mode=FACT_LOAD):
+    """
+    Loads fact_sales from production line items.
 
-    conn.execute(text("TRUNCATE warehouse.dim_products CASCADE"))
+    incremental: inserts only items missing from fact_sales
+    full:        truncates fact_sales and reloads every item
 
-    products[[
-        "product_id", "product_name", "category",
-        "sub_category", "brand",
-        "effective_date", "end_date", "is_current"
-    ]].to_sql(
-        "dim_products",
+    Customer and product keys resolve to the SCD version that was in
+    effect on the transaction date. Returns the number of rows inserted.
+    """
+    # Monthly partitions covering every transaction month (and ahead)
+    partitions.ensure_partitions_for(
+        [FACT_TABLE],
+        "SELECT MIN(transaction_date), MAX(transaction_date) FROM production.transactions",
         conn,
-        schema="warehouse",
-        if_exists="append",
-        index=False
     )
 
-# --------------------------------------------------
-# BUILD FACT SALES
-# --------------------------------------------------
-def build_fact_sales(conn):
-    conn.execute(text("TRUNCATE warehouse.fact_sales CASCADE"))
+    if mode == "full":
+        conn.execute(text("TRUNCATE warehouse.fact_sales CASCADE"))
+        delta = "TRUE"
+    else:
+        delta = fact_delta_filter(conn)
 
-    conn.execute(text("""
-        INSERT INTO warehouse.fact_sales (
-            date_key, customer_key, product_key, payment_method_key,
-            transaction_id, quantity, unit_price,
-            discount_amount, line_total, profit, created_at
+    inserted, last_id = conn.execute(text(f"""
+        WITH inserted AS (
+            INSERT INTO warehouse.fact_sales (
+                date_key, customer_key, product_key, payment_method_key,
+                transaction_id, item_id, quantity, unit_price,
+                discount_amount, line_total, profit, created_at
+            )
+            SELECT
+                dd.date_key,
+                dc.customer_key,
+                dp.product_key,
+                pm.payment_method_key,
+                ti.transaction_id,
+                ti.item_id,
+                ti.quantity,
+                ti.unit_price,
+                ROUND(ti.unit_price * ti.quantity * (ti.discount_percentage / 100.0), 2),
+                ti.line_total,
+                ti.line_total - (p.cost * ti.quantity),
+                CURRENT_TIMESTAMP
+            FROM production.transaction_items ti
+            JOIN production.transactions t
+                ON ti.transaction_id = t.transaction_id
+               AND ti.transaction_date = t.transaction_date
+            JOIN production.products p ON ti.product_id = p.product_id
+            JOIN warehouse.dim_customers dc
+                ON t.customer_id = dc.customer_id
+               AND t.transaction_date >= dc.effective_date
+               AND (dc.end_date IS NULL OR t.transaction_date < dc.end_date)
+            JOIN warehouse.dim_products dp
+                ON p.product_id = dp.product_id
+               AND t.transaction_date >= dp.effective_date
+               AND (dp.end_date IS NULL OR t.transaction_date < dp.end_date)
+            JOIN warehouse.dim_payment_method pm
+                ON t.payment_method = pm.payment_method_name
+            JOIN warehouse.dim_date dd
+                ON t.transaction_date = dd.full_date
+            WHERE {delta}
+            RETURNING item_id
         )
-        SELECT
-            dd.date_key,
-            dc.customer_key,
-            dp.product_key,
-            pm.payment_method_key,
-            ti.transaction_id,
-            ti.quantity,
-            ti.unit_price,
-            ROUND(ti.unit_price * ti.quantity * (ti.discount_percentage / 100.0), 2),
-            ti.line_total,
-            ti.line_total - (p.cost * ti.quantity),
-            CURRENT_TIMESTAMP
-        FROM production.transaction_items ti
-        JOIN production.transactions t ON ti.transaction_id = t.transaction_id
-        JOIN production.products p ON ti.product_id = p.product_id
-        JOIN warehouse.dim_customers dc
-            ON t.customer_id = dc.customer_id AND dc.is_current = TRUE
-        JOIN warehouse.dim_products dp
-            ON p.product_id = dp.product_id AND dp.is_current = TRUE
-        JOIN warehouse.dim_payment_method pm
-            ON t.payment_method = pm.payment_method_name
-        JOIN warehouse.dim_date dd
-            ON t.transaction_date = dd.full_date
-    """))
+        SELECT COUNT(*), MAX({watermarks.id_number("item_id")}) FROM inserted
+    """)).one()
+
+    watermarks.set_watermark(FACT_TABLE, last_id, conn)
+    partitions.apply_retention([FACT_TABLE], conn)
+    return inserted
 
 # --------------------------------------------------
-# BUILD AGGREGATES
+# BUILD AGGREGATES (delta merge)
 # --------------------------------------------------
-def build_aggregates(conn):
-    conn.execute(text("TRUNCATE warehouse.agg_daily_sales CASCADE"))
-    conn.execute(text("""
-        INSERT INTO warehouse.agg_daily_sales
-        SELECT
-            date_key,
-            COUNT(DISTINCT transaction_id),
-            SUM(line_total),
-            SUM(profit),
-            COUNT(DISTINCT customer_key)
-        FROM warehouse.fact_sales
+# Each aggregate keeps its own watermark on fact_sales.sales_key (a
+# sequence, so new fact rows always sort last). Only fact rows past it
+# are aggregated and merged into the stored running sums and counts.
+AGGREGATE_TABLES = [
+    "warehouse.agg_daily_sales",
+    "warehouse.agg_product_performance",
+    "warehouse.agg_customer_metrics",
+]
+
+
+def merge_daily_sales(delta, conn):
+    # Revenue and profit add up; the distinct counts of the affected
+    # days are recounted from their (single-partition) fact rows
+    conn.execute(text(f"""
+        INSERT INTO warehouse.agg_daily_sales AS a (
+            date_key, total_transactions, total_revenue,
+            total_profit, unique_customers
+        )
+        SELECT date_key, 0, SUM(line_total), SUM(profit), 0
+        FROM warehouse.fact_sales f
+        WHERE {delta}
         GROUP BY date_key
+        ON CONFLICT (date_key) DO UPDATE
+        SET total_revenue = a.total_revenue + EXCLUDED.total_revenue,
+            total_profit = a.total_profit + EXCLUDED.total_profit
     """))
 
-    conn.execute(text("TRUNCATE warehouse.agg_product_performance CASCADE"))
-    conn.execute(text("""
-        INSERT INTO warehouse.agg_product_performance
-        SELECT
-            product_key,
-            SUM(quantity),
-            SUM(line_total),
-            SUM(profit)
-        FROM warehouse.fact_sales
+    return conn.execute(text(f"""
+        UPDATE warehouse.agg_daily_sales a
+        SET total_transactions = r.total_transactions,
+            unique_customers = r.unique_customers
+        FROM (
+            SELECT
+                date_key,
+                COUNT(DISTINCT transaction_id) AS total_transactions,
+                COUNT(DISTINCT customer_key) AS unique_customers
+            FROM warehouse.fact_sales
+            WHERE date_key IN (
+                SELECT DISTINCT date_key FROM warehouse.fact_sales f WHERE {delta}
+            )
+            GROUP BY date_key
+        ) r
+        WHERE a.date_key = r.date_key
+    """)).rowcount
+
+
+def merge_product_performance(delta, conn):
+    return conn.execute(text(f"""
+        INSERT INTO warehouse.agg_product_performance AS a (
+            product_key, total_quantity_sold, total_revenue, total_profit
+        )
+        SELECT product_key, SUM(quantity), SUM(line_total), SUM(profit)
+        FROM warehouse.fact_sales f
+        WHERE {delta}
         GROUP BY product_key
-    """))
+        ON CONFLICT (product_key) DO UPDATE
+        SET total_quantity_sold = a.total_quantity_sold + EXCLUDED.total_quantity_sold,
+            total_revenue = a.total_revenue + EXCLUDED.total_revenue,
+            total_profit = a.total_profit + EXCLUDED.total_profit
+    """)).rowcount
 
-    conn.execute(text("TRUNCATE warehouse.agg_customer_metrics CASCADE"))
-    conn.execute(text("""
-        INSERT INTO warehouse.agg_customer_metrics
+
+def merge_customer_metrics(delta, since, conn):
+    # A transaction counts once: only when none of its items were
+    # already aggregated. avg_order_value is rederived from the running
+    # total and line count.
+    return conn.execute(text(f"""
+        INSERT INTO warehouse.agg_customer_metrics AS a (
+            customer_key, total_transactions, total_spent,
+            avg_order_value, last_purchase_date, line_item_count
+        )
         SELECT
-            customer_key,
-            COUNT(DISTINCT transaction_id),
-            SUM(line_total),
-            AVG(line_total),
-            MAX(created_at::date)
-        FROM warehouse.fact_sales
-        GROUP BY customer_key
-    """))
+            f.customer_key,
+            COUNT(DISTINCT f.transaction_id) FILTER (
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM warehouse.fact_sales o
+                    WHERE o.transaction_id = f.transaction_id
+                      AND o.date_key = f.date_key
+                      AND o.sales_key <= {since}
+                )
+            ),
+            SUM(f.line_total),
+            AVG(f.line_total),
+            MAX(d.full_date),
+            COUNT(*)
+        FROM warehouse.fact_sales f
+        JOIN warehouse.dim_date d ON f.date_key = d.date_key
+        WHERE {delta}
+        GROUP BY f.customer_key
+        ON CONFLICT (customer_key) DO UPDATE
+        SET total_transactions = a.total_transactions + EXCLUDED.total_transactions,
+            total_spent = a.total_spent + EXCLUDED.total_spent,
+            line_item_count = a.line_item_count + EXCLUDED.line_item_count,
+            avg_order_value = ROUND(
+                (a.total_spent + EXCLUDED.total_spent)
+                / (a.line_item_count + EXCLUDED.line_item_count), 2
+            ),
+            last_purchase_date = GREATEST(a.last_purchase_date, EXCLUDED.last_purchase_date)
+    """)).rowcount
+
+
+def build_aggregate(table, conn, full_refresh=False):
+    """
+    Merges the fact rows loaded since the aggregate's watermark into it.
+    With full_refresh the aggregate is emptied first, which resets its
+    watermark, so it is rebuilt from the whole fact table. An aggregate
+    with rows but no watermark is rebuilt the same way: merging every
+    fact row into it would count its contents twice. Returns the number
+    of aggregate rows touched.
+    """
+    since = 0 if full_refresh else watermarks.get_watermark(table, conn)
+    if since == 0:
+        conn.execute(text(f"TRUNCATE {table}"))
+
+    upto = conn.execute(text("SELECT MAX(sales_key) FROM warehouse.fact_sales")).scalar()
+    if upto is None:
+        return 0
+
+    delta = f"f.sales_key > {since} AND f.sales_key <= {upto}"
+
+    if table == "warehouse.agg_daily_sales":
+        merged = merge_daily_sales(delta, conn)
+    elif table == "warehouse.agg_product_performance":
+        merged = merge_product_performance(delta, conn)
+    else:
+        merged = merge_customer_metrics(delta, since, conn)
+
+    watermarks.set_watermark(table, upto, conn)
+    return merged
+
+
+def build_aggregates(conn, full_refresh=False):
+    return {
+        table: build_aggregate(table, conn, full_refresh)
+        for table in AGGREGATE_TABLES
+    }
 
 # --------------------------------------------------
-# MAIN
+# LOAD GRAPH
 # --------------------------------------------------
-def run_warehouse_load():
+def load_stages(fact_load=FACT_LOAD):
+    """
+    The warehouse load as ordered stages of {node: build(conn)}. Nodes of
+    one stage do not depend on each other; a stage needs every node of
+    the previous one to have finished.
+    """
+    full_refresh = fact_load == "full"
+    return [
+        {
+            "dim_date": build_dim_date,
+            "dim_payment_method": build_dim_payment_method,
+            "dim_customers": build_dim_customers,
+            "dim_products": build_dim_products,
+        },
+        {
+            "fact_sales": partial(build_fact_sales, mode=fact_load),
+        },
+        {
+            table.split(".")[1]: partial(build_aggregate, table, full_refresh=full_refresh)
+            for table in AGGREGATE_TABLES
+        },
+    ]
+
+
+def timed_build(name, build, conn):
+    """Runs one node and returns its report entry."""
+    node_start = time.time()
+    result = build(conn=conn)
+    elapsed = time.time() - node_start
+
+    print(f"✅ Built {name} in {elapsed:.2f}s")
+
+    return {
+        "status": "success",
+        "duration_seconds": round(elapsed, 3),
+        "result": result,
+    }
+
+
+def failed_entry(error):
+    return {
+        "status": "failed",
+        "error_message": str(error),
+    }
+
+
+def build_in_transaction(name, build):
     with engine.begin() as conn:
-        build_dim_date("2024-01-01", "2024-12-31", conn)
-        build_dim_payment_method(conn)
-        build_dim_customers(conn)
-        build_dim_products(conn)
-        build_fact_sales(conn)
-        build_aggregates(conn)
+        return timed_build(name, build, conn)
+
+
+def run_atomic(stages, report):
+    """Every node in turn inside one transaction: all or nothing."""
+    with engine.begin() as conn:
+        for stage in stages:
+            for name, build in stage.items():
+                try:
+                    report["nodes"][name] = timed_build(name, build, conn)
+                except Exception as e:
+                    report["nodes"][name] = failed_entry(e)
+                    raise
+
+
+def run_parallel(stages, report):
+    """
+    Each stage's nodes run at the same time, each on its own pooled
+    connection and transaction. Every build is idempotent and commits
+    its own watermark, so a failed stage stops the load and the next run
+    picks up from what was committed.
+    """
+    for stage in stages:
+        with ThreadPoolExecutor(max_workers=len(stage)) as pool:
+            futures = {
+                name: pool.submit(build_in_transaction, name, build)
+                for name, build in stage.items()
+            }
+
+        errors = []
+        for name, future in futures.items():
+            try:
+                report["nodes"][name] = future.result()
+            except Exception as e:
+                report["nodes"][name] = failed_entry(e)
+                errors.append(e)
+
+        if errors:
+            raise errors[0]
+
+# --------------------------------------------------
+# MAIN
+# --------------------------------------------------
+def run_warehouse_load(fact_load=FACT_LOAD, mode=EXECUTION_MODE):
+    start_time = time.time()
+
+    report = {
+        "load_timestamp": datetime.utcnow().isoformat(),
+        "mode": mode,
+        "fact_load": fact_load,
+        "nodes": {},
+    }
+
+    try:
+        if mode == "atomic":
+            run_atomic(load_stages(fact_load), report)
+        else:
+            run_parallel(load_stages(fact_load), report)
+    finally:
+        report["total_execution_time_seconds"] = round(time.time() - start_time, 2)
+
+        os.makedirs(REPORT_PATH, exist_ok=True)
+        with open(f"{REPORT_PATH}/warehouse_load_report.json", "w") as f:
+            json.dump(report, f, indent=2)
 
     print("✅ Warehouse load completed successfully")
+    return report
 
 if __name__ == "__main__":
-    run_warehouse_load()
+    parser = argparse.ArgumentParser(description="Load the warehouse star schema")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="truncate and rebuild fact_sales instead of loading new items")
+    parser.add_argument("--mode", choices=["parallel", "atomic"], default=EXECUTION_MODE)
+    args = parser.parse_args()
+
+    run_warehouse_load("full" if args.full_refresh else FACT_LOAD, mode=args.mode)
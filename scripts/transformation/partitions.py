@@ -0,0 +1,188 @@
+from datetime import date
+
+import yaml
+from sqlalchemy import text
+
+from scripts import catalog
+
+
+# --------------------------------------------------
+# Monthly range partitions
+# --------------------------------------------------
+with open("config/config.yaml") as f:
+    PARTITION_CONFIG = yaml.safe_load(f).get("partitioning", {})
+
+# Empty partitions created past the newest month in the data
+MONTHS_AHEAD = PARTITION_CONFIG.get("months_ahead", 3)
+
+# Months of history kept attached; None keeps everything
+RETENTION_MONTHS = PARTITION_CONFIG.get("retention_months")
+
+# drop: detached partitions are dropped
+# keep: detached partitions stay behind as standalone tables
+DETACH_ACTION = PARTITION_CONFIG.get("detach_action", "keep")
+
+# Partitioned table -> partition key and how its bounds are written.
+# Order matters for retention: items reference transactions, so their
+# partitions are detached first.
+PARTITIONED_TABLES = {
+    "production.transaction_items": {"key": "transaction_date", "kind": "date"},
+    "production.transactions": {"key": "transaction_date", "kind": "date"},
+    "warehouse.fact_sales": {"key": "date_key", "kind": "date_key"},
+}
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(start, end):
+    """First day of every month from start's month to end's month inclusive."""
+    month, last = month_start(start), month_start(end)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def bound(table, month):
+    if PARTITIONED_TABLES[table]["kind"] == "date_key":
+        return f"{month:%Y%m%d}"
+    return f"'{month:%Y-%m-%d}'"
+
+
+def attached_partitions(table, conn):
+    """Names (schema.table) of the partitions currently attached to `table`."""
+    rows = conn.execute(
+        text("""
+            SELECT n.nspname || '.' || c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE i.inhparent = CAST(:table AS regclass)
+        """),
+        {"table": table},
+    )
+    return {name for (name,) in rows}
+
+
+def partition_month(table, name):
+    suffix = name[len(table) + 2:]
+    return date(int(suffix[:4]), int(suffix[4:6]), 1)
+
+
+def retention_cutoff(retention_months=RETENTION_MONTHS, today=None):
+    """First month kept attached, or None when everything is kept."""
+    if not retention_months:
+        return None
+    return add_months(month_start(today or date.today()), -retention_months)
+
+
+# --------------------------------------------------
+# Creation
+# --------------------------------------------------
+def ensure_partitions(table, start, end, conn, months_ahead=MONTHS_AHEAD,
+                      retention_months=RETENTION_MONTHS, today=None):
+    """
+    Makes sure `table` has a partition for every month from `start` to
+    `end` plus `months_ahead`. Each missing partition is created as a
+    standalone table and then attached, which only takes a SHARE UPDATE
+    EXCLUSIVE lock on the parent, so readers are not blocked. Months
+    before the retention cutoff are skipped, so a kept partition is not
+    attached again. Returns the partitions created.
+    """
+    attached = attached_partitions(table, conn)
+    cutoff = retention_cutoff(retention_months, today)
+    created = []
+
+    for month in month_range(start, add_months(month_start(end), months_ahead)):
+        name = partition_name(table, month)
+        if name in attached or (cutoff and month < cutoff):
+            continue
+
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} "
+            f"(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        ))
+        conn.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ({bound(table, month)}) "
+            f"TO ({bound(table, add_months(month, 1))})"
+        ))
+        created.append(name)
+
+    if created:
+        catalog.invalidate()
+    return created
+
+
+def ensure_partitions_for(tables, date_query, conn):
+    """
+    Ensures partitions for each table over the [min, max] date returned by
+    `date_query`. Nothing happens when the query finds no rows.
+    """
+    first, last = conn.execute(text(date_query)).one()
+    if first is None:
+        return []
+
+    created = []
+    for table in tables:
+        created += ensure_partitions(table, first, last, conn)
+    return created
+
+
+# --------------------------------------------------
+# Retention
+# --------------------------------------------------
+def detach_partitions_before(table, cutoff, conn, action=DETACH_ACTION):
+    """
+    Detaches every partition of `table` for months before `cutoff`, then
+    drops it or leaves it as a standalone table. A kept table loses its
+    foreign keys: it is an archive, and the key it inherited from an
+    items -> transactions reference would otherwise block detaching the
+    referenced partition. Returns the partitions detached.
+    """
+    detached = []
+    for name in sorted(attached_partitions(table, conn)):
+        if partition_month(table, name) >= month_start(cutoff):
+            continue
+
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if action == "drop":
+            conn.execute(text(f"DROP TABLE {name}"))
+        else:
+            foreign_keys = conn.execute(
+                text("""
+                    SELECT conname FROM pg_constraint
+                    WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'
+                """),
+                {"table": name},
+            ).scalars().all()
+            for constraint in foreign_keys:
+                conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {constraint}"))
+        detached.append(name)
+
+    if detached:
+        catalog.invalidate()
+    return detached
+
+
+def apply_retention(tables, conn, retention_months=RETENTION_MONTHS, today=None):
+    """Detaches partitions older than the retention window, in dependency order."""
+    cutoff = retention_cutoff(retention_months, today)
+    if cutoff is None:
+        return []
+
+    detached = []
+    for table in PARTITIONED_TABLES:
+        if table in tables:
+            detached += detach_partitions_before(table, cutoff, conn)
+    return detached
@@ -1,68 +1,205 @@
-import pandas as pd
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import URL
+from sqlalchemy import text
 from datetime import datetime, timezone
-import os
+import yaml
+
+from scripts import catalog, schemas
+from scripts.db import get_engine
+from scripts.transformation import partitions, watermarks
 
 # --------------------------------------------------
 # DB connection
 # --------------------------------------------------
-db_url = URL.create(
-    drivername="postgresql+psycopg2",
-    username=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASSWORD"),
-    host=os.getenv("DB_HOST"),
-    port=int(os.getenv("DB_PORT", "5432")),
-    database=os.getenv("DB_NAME"),
-)
+engine = get_engine("staging_to_production")
+
+# --------------------------------------------------
+# Transformation mode
+# --------------------------------------------------
+with open("config/config.yaml") as f:
+    TRANSFORMATION_CONFIG = yaml.safe_load(f).get("transformation", {})
+
+# pandas: read staging into DataFrames, filter, write back with to_sql
+# sql:    INSERT ... SELECT ... ON CONFLICT inside the database
+TRANSFORMATION_MODE = TRANSFORMATION_CONFIG.get("mode", "pandas")
+
+# How far (in ID numbers) below the watermark to look for late arrivals
+LATE_ARRIVAL_LOOKBACK = TRANSFORMATION_CONFIG.get("late_arrival_lookback", 10000)
 
-engine = create_engine(db_url, future=True)
+# Partitioned production fact tables (see partitions.py)
+FACT_PARTITIONS = ["production.transactions", "production.transaction_items"]
+
+# Columns managed by the target table rather than copied from staging
+AUDIT_COLUMNS = {"loaded_at", "created_at", "updated_at"}
+
+# Per-table load rules shared by both modes
+TABLE_RULES = {
+    "customers": {
+        "pk": "customer_id",
+        "required": ["customer_id", "email"],
+        "defaults": {},
+        "referenced_by": [("transactions", "customer_id")],
+    },
+    "products": {
+        "pk": "product_id",
+        "required": ["product_id", "product_name", "price", "cost"],
+        "defaults": {"product_name": "UNKNOWN_PRODUCT"},
+        "referenced_by": [("transaction_items", "product_id")],
+    },
+    "transactions": {
+        "pk": "transaction_id",
+        "required": ["transaction_id"],
+        "defaults": {},
+    },
+    "transaction_items": {
+        "pk": "item_id",
+        "required": ["item_id", "transaction_date"],
+        "defaults": {},
+        # Partition key copied from the parent transaction, which may have
+        # arrived in this batch or an earlier one
+        "joins": """
+            LEFT JOIN staging.transactions st ON st.transaction_id = s.transaction_id
+            LEFT JOIN production.transactions pt ON pt.transaction_id = s.transaction_id
+        """,
+        # Transactions load first and never overwrite an existing row, so
+        # the production date is the one the item's foreign key must match
+        "derived": {
+            "transaction_date": "COALESCE(pt.transaction_date, st.transaction_date)",
+        },
+    },
+}
 
 
 # --------------------------------------------------
-# Helper: get table columns
+# Helpers: table metadata (cached, see scripts/catalog.py)
 # --------------------------------------------------
-def get_table_columns(table_name, conn):
-    return pd.read_sql(
-        f"""
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_schema = 'production'
-          AND table_name = '{table_name}'
-        """,
-        conn,
-    )["column_name"].tolist()
+def get_table_columns(table_name, conn, schema="production"):
+    return catalog.get_columns(f"{schema}.{table_name}", conn)
+
+
+def get_column_types(table_name, conn, schema="production"):
+    """Column name -> SQL type (e.g. numeric(12,2)) for a table."""
+    return catalog.get_column_types(f"{schema}.{table_name}", conn)
+
+
+def get_source_columns(source, conn):
+    """Columns of a schema table (from the catalog cache) or a temp table."""
+    if "." in source:
+        return catalog.get_columns(source, conn)
+    return list(conn.execute(text(f"SELECT * FROM {source} LIMIT 0")).keys())
 
 
 # --------------------------------------------------
-# Dimension loader (SCHEMA-SAFE)
+# Dimension loader (row-hash merge)
 # --------------------------------------------------
-def load_dimension(df, table_name, conn):
+def merge_dimension(table_name, source, conn):
     """
-    Full reload dimension tables.
-    Automatically drops columns not present in target table.
+    Merges `source` (staging.<table> or a temp table) into
+    production.<table>, touching only rows whose content changed.
+
+    Source rows get the table rules (defaults, NOT NULL filter, latest row
+    per key), are cast to the production column types and hashed with
+    md5 over the whole row. Rows are then deleted when gone from the
+    source (unless a fact row still references them), updated when their
+    hash differs from the stored row_hash, and inserted when new.
+    Returns the inserted/updated/deleted/unchanged counts.
     """
+    rules = TABLE_RULES[table_name]
+    pk = rules["pk"]
 
-    # Enforce critical NOT NULLs
-    if table_name == "customers":
-        df = df.dropna(subset=["customer_id", "email"])
+    target_types = get_column_types(table_name, conn)
+    source_cols = get_source_columns(source, conn)
+    columns = [
+        c for c in source_cols
+        if c in target_types and c not in AUDIT_COLUMNS and c != "row_hash"
+    ]
 
-    if table_name == "products":
-        df["product_name"] = df["product_name"].fillna("UNKNOWN_PRODUCT")
-        df = df.dropna(subset=["product_id", "product_name", "price", "cost"])
+    select = []
+    for c in columns:
+        value = f"COALESCE({c}, :default_{c})" if c in rules["defaults"] else c
+        select.append(f"CAST({value} AS {target_types[c]}) AS {c}")
 
-    # Get actual DB columns
-    target_cols = get_table_columns(table_name, conn)
+    where = " AND ".join(
+        f"{c} IS NOT NULL" for c in rules["required"] if c not in rules["defaults"]
+    )
+    order = f"{pk}, loaded_at DESC" if "loaded_at" in source_cols else pk
+
+    changes = f"dim_changes_{table_name}"
+    conn.execute(
+        text(f"""
+            CREATE TEMP TABLE {changes} ON COMMIT DROP AS
+            SELECT d.*, md5(d::text) AS row_hash
+            FROM (
+                SELECT DISTINCT ON ({pk}) {', '.join(select)}
+                FROM {source}
+                WHERE {where}
+                ORDER BY {order}
+            ) d
+        """),
+        {f"default_{c}": v for c, v in rules["defaults"].items()},
+    )
+
+    # Deletes (keep rows that facts still point at)
+    referenced = " ".join(
+        f"AND NOT EXISTS (SELECT 1 FROM production.{fact} f WHERE f.{fk} = p.{pk})"
+        for fact, fk in rules.get("referenced_by", [])
+    )
+    deleted = conn.execute(text(f"""
+        DELETE FROM production.{table_name} p
+        WHERE NOT EXISTS (SELECT 1 FROM {changes} c WHERE c.{pk} = p.{pk})
+        {referenced}
+    """)).rowcount
+
+    # Updates (hash changed)
+    assignments = [f"{c} = c.{c}" for c in columns if c != pk]
+    assignments.append("row_hash = c.row_hash")
+    if "updated_at" in target_types:
+        assignments.append("updated_at = CURRENT_TIMESTAMP")
+    updated = conn.execute(text(f"""
+        UPDATE production.{table_name} p
+        SET {', '.join(assignments)}
+        FROM {changes} c
+        WHERE c.{pk} = p.{pk}
+          AND p.row_hash IS DISTINCT FROM c.row_hash
+    """)).rowcount
+
+    # Inserts (new keys)
+    insert = columns + ["row_hash"]
+    inserted = conn.execute(text(f"""
+        INSERT INTO production.{table_name} ({', '.join(insert)})
+        SELECT {', '.join(insert)}
+        FROM {changes} c
+        WHERE NOT EXISTS (
+            SELECT 1 FROM production.{table_name} p WHERE p.{pk} = c.{pk}
+        )
+    """)).rowcount
+
+    total = conn.execute(text(f"SELECT COUNT(*) FROM {changes}")).scalar()
 
-    # Drop extra columns (like loaded_at)
-    df = df[[c for c in df.columns if c in target_cols]]
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": total - inserted - updated,
+    }
+
+
+def load_dimension(df, table_name, conn):
+    """
+    Pandas path: applies the table rules to `df`, stages it in a temp
+    table and merges it like the SQL path.
+    """
+    rules = TABLE_RULES[table_name]
 
-    # Idempotent reload
-    conn.execute(text(f"TRUNCATE TABLE production.{table_name} CASCADE;"))
+    # Enforce critical NOT NULLs
+    for col, default in rules["defaults"].items():
+        df[col] = df[col].fillna(default)
+    df = df.dropna(subset=rules["required"])
 
+    source = f"tmp_{table_name}"
+    conn.execute(text(
+        f"CREATE TEMP TABLE {source} (LIKE staging.{table_name}) ON COMMIT DROP"
+    ))
     df.to_sql(
-        name=table_name,
-        schema="production",
+        name=source,
         con=conn,
         if_exists="append",
         index=False,
@@ -70,31 +207,87 @@ def load_dimension(df, table_name, conn):
         chunksize=1000,
     )
 
+    return merge_dimension(table_name, source, conn)
+
 
 # --------------------------------------------------
 # Fact loader (INCREMENTAL + loaded_at)
 # --------------------------------------------------
-def load_fact_incremental(df, table_name, conn, pk):
+def fact_delta_filter(table_name, conn, alias="s"):
+    """
+    WHERE clause selecting the staging rows that still need loading:
+    IDs past the table's watermark (less a lookback window for late
+    arrivals) that are not already in production. The anti-join probes
+    the production primary key, so its cost follows the batch size, not
+    the table history.
+    """
+    pk = TABLE_RULES[table_name]["pk"]
+    watermark = watermarks.get_watermark(table_name, conn)
+
+    # Staging reloaded with a sequence that ends below the watermark (e.g.
+    # a regenerated dataset): every row may be new, so read it all and let
+    # the anti-join skip what production already holds
+    staging_max = conn.execute(text(
+        f"SELECT MAX({watermarks.id_number(pk)}) FROM staging.{table_name}"
+    )).scalar()
+    if staging_max is not None and staging_max < watermark:
+        watermark = 0
+
+    since = max(watermark - LATE_ARRIVAL_LOOKBACK, 0)
+
+    delta = f"""
+        {watermarks.id_number(f"{alias}.{pk}")} > {since}
+        AND NOT EXISTS (
+            SELECT 1 FROM production.{table_name} p
+            WHERE p.{pk} = {alias}.{pk}
+        )
+    """
+
+    # Months past retention have no partition to land in
+    cutoff = partitions.retention_cutoff()
+    if cutoff:
+        transaction_date = TABLE_RULES[table_name].get("derived", {}).get(
+            "transaction_date", f"{alias}.transaction_date"
+        )
+        delta += f" AND {transaction_date} >= '{cutoff:%Y-%m-%d}'"
+    return delta
+
+
+def load_fact_incremental(table_name, conn, pk):
     """
     Incremental load for fact tables.
-    Adds loaded_at only if column exists.
+    Only staging rows past the watermark are read; loaded_at is added
+    only if the column exists.
     """
 
+    rules = TABLE_RULES[table_name]
     target_cols = get_table_columns(table_name, conn)
+    derived = "".join(
+        f", {expr} AS {col}" for col, expr in rules.get("derived", {}).items()
+    )
 
-    if "loaded_at" in target_cols:
-        df["loaded_at"] = datetime.now(timezone.utc)
-
-    # Remove rows already loaded
-    existing_ids = pd.read_sql(
-        f"SELECT {pk} FROM production.{table_name}", conn
-    )[pk].tolist()
+    df_new = schemas.read_sql(
+        f"""
+        SELECT s.*{derived}
+        FROM staging.{table_name} s
+        {rules.get("joins", "")}
+        WHERE {fact_delta_filter(table_name, conn)}
+        ORDER BY s.loaded_at
+        """,
+        conn,
+        table_name,
+    )
 
-    df_new = df[~df[pk].isin(existing_ids)]
+    # Duplicate arrivals within the batch: keep the most recently loaded
+    # row, as the SQL path does
+    df_new = df_new.dropna(subset=rules["required"]).drop_duplicates(subset=[pk], keep="last")
 
     if df_new.empty:
         return 0
 
+    if "loaded_at" in target_cols:
+        df_new["loaded_at"] = datetime.now(timezone.utc)
+
     # Drop non-existing columns
     df_new = df_new[[c for c in df_new.columns if c in target_cols]]
 
@@ -108,30 +301,141 @@ def load_fact_incremental(df, table_name, conn, pk):
         chunksize=1000,
     )
 
+    last_id = df_new[pk].str.extract(r"(\d+)$", expand=False).astype("int64").max()
+    watermarks.set_watermark(table_name, last_id, conn)
+
     return len(df_new)
 
 
+# --------------------------------------------------
+# SQL mode: set-based upsert (no rows through Python)
+# --------------------------------------------------
+def upsert_from_staging(table_name, conn):
+    """
+    Copies new fact rows from staging.<table> into production.<table>
+    with one INSERT ... SELECT ... ON CONFLICT DO NOTHING statement.
+
+    Applies the same rules as the pandas path: NOT NULL filtering,
+    derived columns and projection onto the target columns. Only staging
+    rows past the watermark are read, duplicate keys keep the most
+    recently loaded row, and the watermark is advanced. Returns the
+    number of rows inserted.
+    """
+    rules = TABLE_RULES[table_name]
+    pk = rules["pk"]
+    derived = rules.get("derived", {})
+
+    staging_cols = get_table_columns(table_name, conn, schema="staging")
+    target_cols = get_table_columns(table_name, conn)
+    columns = [c for c in staging_cols if c in target_cols and c not in AUDIT_COLUMNS]
+
+    select = [
+        f"COALESCE(s.{c}, :default_{c}) AS {c}" if c in rules["defaults"] else f"s.{c}"
+        for c in columns
+    ]
+    insert = list(columns)
+    for col, expr in derived.items():
+        insert.append(col)
+        select.append(f"{expr} AS {col}")
+    if "loaded_at" in target_cols:
+        insert.append("loaded_at")
+        select.append("CURRENT_TIMESTAMP")
+
+    where = " AND ".join(
+        f"({derived.get(c, f's.{c}')}) IS NOT NULL"
+        for c in rules["required"] if c not in rules["defaults"]
+    )
+    where += f" AND {fact_delta_filter(table_name, conn)}"
+
+    # Partitioned targets have a composite key (id + partition key)
+    conflict = ", ".join(catalog.get_primary_key(f"production.{table_name}", conn))
+
+    rows, last_id = conn.execute(
+        text(f"""
+            WITH inserted AS (
+                INSERT INTO production.{table_name} ({', '.join(insert)})
+                SELECT DISTINCT ON (s.{pk}) {', '.join(select)}
+                FROM staging.{table_name} s
+                {rules.get("joins", "")}
+                WHERE {where}
+                ORDER BY s.{pk}, s.loaded_at DESC
+                ON CONFLICT ({conflict}) DO NOTHING
+                RETURNING {pk}
+            )
+            SELECT COUNT(*), MAX({watermarks.id_number(pk)}) FROM inserted
+        """),
+        {f"default_{c}": v for c, v in rules["defaults"].items()},
+    ).one()
+
+    watermarks.set_watermark(table_name, last_id, conn)
+
+    return rows
+
+
+def run_sql_mode(conn):
+    return {
+        "customers": merge_dimension("customers", "staging.customers", conn),
+        "products": merge_dimension("products", "staging.products", conn),
+        "transactions": upsert_from_staging("transactions", conn),
+        "transaction_items": upsert_from_staging("transaction_items", conn),
+    }
+
+
+# --------------------------------------------------
+# Pandas mode
+# --------------------------------------------------
+def run_pandas_mode(conn):
+    counts = {}
+
+    # Customers
+    cust = schemas.read_sql("SELECT * FROM staging.customers", conn, "customers")
+    counts["customers"] = load_dimension(cust, "customers", conn)
+
+    # Products
+    prod = schemas.read_sql("SELECT * FROM staging.products", conn, "products")
+    counts["products"] = load_dimension(prod, "products", conn)
+
+    # Transactions (fact)
+    counts["transactions"] = load_fact_incremental("transactions", conn, "transaction_id")
+
+    # Transaction items (fact)
+    counts["transaction_items"] = load_fact_incremental("transaction_items", conn, "item_id")
+
+    return counts
+
+
 # --------------------------------------------------
 # Main pipeline
 # --------------------------------------------------
-def run_staging_to_production():
+def run_staging_to_production(mode=TRANSFORMATION_MODE):
+    """
+    Returns per-table results: inserted/updated/deleted/unchanged counts
+    for dimensions and the number of rows inserted for facts.
+    """
     with engine.begin() as conn:
+        # Monthly partitions for every month in this batch (and ahead)
+        created = partitions.ensure_partitions_for(
+            FACT_PARTITIONS,
+            "SELECT MIN(transaction_date), MAX(transaction_date) FROM staging.transactions",
+            conn,
+        )
+
+        if mode == "sql":
+            counts = run_sql_mode(conn)
+        else:
+            counts = run_pandas_mode(conn)
 
-        # Customers
-        cust = pd.read_sql("SELECT * FROM staging.customers", conn)
-        load_dimension(cust, "customers", conn)
+        detached = partitions.apply_retention(FACT_PARTITIONS, conn)
 
-        # Products
-        prod = pd.read_sql("SELECT * FROM staging.products", conn)
-        load_dimension(prod, "products", conn)
+    if created:
+        print(f"  created {len(created)} partitions ({created[0]} .. {created[-1]})")
+    if detached:
+        print(f"  detached {len(detached)} partitions")
 
-        # Transactions (fact)
-        txn = pd.read_sql("SELECT * FROM staging.transactions", conn)
-        load_fact_incremental(txn, "transactions", conn, "transaction_id")
+    for table, result in counts.items():
+        print(f"  production.{table}: {result}")
 
-        # Transaction items (fact)
-        items = pd.read_sql("SELECT * FROM staging.transaction_items", conn)
-        load_fact_incremental(items, "transaction_items", conn, "item_id")
+    return counts
 
 
 if __name__ == "__main__":
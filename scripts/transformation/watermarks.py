@@ -0,0 +1,92 @@
+from sqlalchemy import text
+
+
+# --------------------------------------------------
+# High-water marks for incremental fact loads
+# --------------------------------------------------
+# Fact IDs are a prefix plus a zero-padded sequence (TXN00042, ITEM00042),
+# so the numeric suffix orders rows by arrival.
+def id_number(column):
+    """SQL expression for the numeric suffix of an ID column."""
+    return f"CAST(SUBSTRING({column} FROM '[0-9]+$') AS BIGINT)"
+
+
+def watermark_table(table_name):
+    """
+    Where the watermark of `table_name` is kept: warehouse tables have
+    their own table, so recreating the production schema does not lose
+    the watermarks of warehouse tables that keep their rows.
+    """
+    if table_name.startswith("warehouse."):
+        return "warehouse.load_watermarks"
+    return "production.load_watermarks"
+
+
+def get_watermark(table_name, conn):
+    """
+    Last loaded ID number for production.<table_name> (or a schema
+    qualified table such as warehouse.fact_sales), or 0 if nothing has
+    been recorded. A watermark is ignored when the table is empty, e.g.
+    after TRUNCATE ... CASCADE of a dimension, so the next run reloads
+    from scratch instead of skipping everything.
+    """
+    table = table_name if "." in table_name else f"production.{table_name}"
+    has_rows = conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {table})")
+    ).scalar()
+    if not has_rows:
+        return 0
+
+    last_id = conn.execute(
+        text(f"SELECT last_id FROM {watermark_table(table_name)} WHERE table_name = :t"),
+        {"t": table_name},
+    ).scalar()
+    return last_id or 0
+
+
+def get_loaded_at(table_name, conn):
+    """When the watermark of `table_name` last moved, or None."""
+    return conn.execute(
+        text(f"SELECT last_loaded_at FROM {watermark_table(table_name)} WHERE table_name = :t"),
+        {"t": table_name},
+    ).scalar()
+
+
+def set_watermark(table_name, last_id, conn):
+    """
+    Advances the watermark; it never moves backwards. last_loaded_at
+    records when it last moved, so a run that loaded nothing new leaves
+    it alone.
+    """
+    if last_id is None:
+        return
+
+    marks = watermark_table(table_name)
+    conn.execute(
+        text(f"""
+            INSERT INTO {marks} (table_name, last_id, last_loaded_at)
+            VALUES (:t, :last_id, CURRENT_TIMESTAMP)
+            ON CONFLICT (table_name) DO UPDATE
+            SET last_id = EXCLUDED.last_id,
+                last_loaded_at = EXCLUDED.last_loaded_at
+            WHERE EXCLUDED.last_id > {marks}.last_id
+        """),
+        {"t": table_name, "last_id": int(last_id)},
+    )
+
+
+def mark_loaded(table_name, conn):
+    """
+    Records that `table_name` changed now without moving its last_id, for
+    tables such as SCD2 dimensions that are not loaded by ID ranges.
+    """
+    marks = watermark_table(table_name)
+    conn.execute(
+        text(f"""
+            INSERT INTO {marks} (table_name, last_id, last_loaded_at)
+            VALUES (:t, 0, CURRENT_TIMESTAMP)
+            ON CONFLICT (table_name) DO UPDATE
+            SET last_loaded_at = EXCLUDED.last_loaded_at
+        """),
+        {"t": table_name},
+    )
@@ -22,6 +22,7 @@ CREATE TABLE production.customers (
     state              VARCHAR(100),
     country            VARCHAR(120),
     age_group          VARCHAR(20),
+    row_hash           CHAR(32),
     created_at         TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at         TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -41,6 +42,7 @@ CREATE TABLE production.products (
     brand             VARCHAR(100),
     stock_quantity    INTEGER CHECK (stock_quantity >= 0),
     supplier_id       VARCHAR(30),
+    row_hash          CHAR(32),
     created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -51,7 +53,7 @@ CREATE TABLE production.products (
 DROP TABLE IF EXISTS production.transactions CASCADE;
 
 CREATE TABLE production.transactions (
-    transaction_id    VARCHAR(20) PRIMARY KEY,
+    transaction_id    VARCHAR(20) NOT NULL,
     customer_id       VARCHAR(20) NOT NULL,
     transaction_date  DATE NOT NULL,
     transaction_time  TIME NOT NULL,
@@ -64,10 +66,16 @@ CREATE TABLE production.transactions (
     updated_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     loaded_at         TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
 
+    -- The partition key has to be part of every unique constraint
+    PRIMARY KEY (transaction_id, transaction_date),
+
     CONSTRAINT fk_txn_customer
         FOREIGN KEY (customer_id)
         REFERENCES production.customers(customer_id)
-);
+) PARTITION BY RANGE (transaction_date);
+
+-- Monthly partitions (transactions_pYYYYMM) are created by
+-- scripts/transformation/partitions.py during the pipeline run
 
 CREATE INDEX idx_transactions_date
     ON production.transactions(transaction_date);
@@ -81,8 +89,10 @@ CREATE INDEX idx_transactions_customer
 DROP TABLE IF EXISTS production.transaction_items CASCADE;
 
 CREATE TABLE production.transaction_items (
-    item_id              VARCHAR(20) PRIMARY KEY,
+    item_id              VARCHAR(20) NOT NULL,
     transaction_id       VARCHAR(20) NOT NULL,
+    -- Copied from the parent transaction; partition key
+    transaction_date     DATE NOT NULL,
     product_id           VARCHAR(20) NOT NULL,
     quantity             INTEGER CHECK (quantity > 0),
     unit_price           DECIMAL(12,2) CHECK (unit_price >= 0),
@@ -93,17 +103,30 @@ CREATE TABLE production.transaction_items (
     created_at           TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at           TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
 
+    PRIMARY KEY (item_id, transaction_date),
+
     CONSTRAINT fk_item_transaction
-        FOREIGN KEY (transaction_id)
-        REFERENCES production.transactions(transaction_id),
+        FOREIGN KEY (transaction_id, transaction_date)
+        REFERENCES production.transactions(transaction_id, transaction_date),
 
     CONSTRAINT fk_item_product
         FOREIGN KEY (product_id)
         REFERENCES production.products(product_id)
-);
+) PARTITION BY RANGE (transaction_date);
 
 CREATE INDEX idx_items_transaction
     ON production.transaction_items(transaction_id);
 
 CREATE INDEX idx_items_product
     ON production.transaction_items(product_id);
+
+-- ==================================================
+-- Load watermarks (incremental fact loading)
+-- ==================================================
+DROP TABLE IF EXISTS production.load_watermarks;
+
+CREATE TABLE production.load_watermarks (
+    table_name      VARCHAR(100) PRIMARY KEY,
+    last_id         BIGINT NOT NULL DEFAULT 0,
+    last_loaded_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -17,7 +17,12 @@ CREATE TABLE IF NOT EXISTS warehouse.dim_date (
     month_name VARCHAR(20),
     day_name VARCHAR(20),
     week_of_year INTEGER,
-    is_weekend BOOLEAN
+    is_weekend BOOLEAN,
+    fiscal_year INTEGER,
+    fiscal_quarter INTEGER,
+    fiscal_month INTEGER,
+    is_holiday BOOLEAN,
+    holiday_name VARCHAR(50)
 );
 
 -- =========================
@@ -25,7 +30,7 @@ CREATE TABLE IF NOT EXISTS warehouse.dim_date (
 -- =========================
 CREATE TABLE IF NOT EXISTS warehouse.dim_payment_method (
     payment_method_key SERIAL PRIMARY KEY,
-    payment_method_name VARCHAR(30),
+    payment_method_name VARCHAR(30) UNIQUE,
     payment_type VARCHAR(20)
 );
 
@@ -44,6 +49,7 @@ CREATE TABLE warehouse.dim_customers (
     country             VARCHAR(100),
     age_group           VARCHAR(20),
     registration_date   DATE,
+    attribute_hash      CHAR(32),
     effective_date      DATE NOT NULL,
     end_date            DATE,
     is_current          BOOLEAN DEFAULT TRUE
@@ -61,6 +67,7 @@ CREATE TABLE IF NOT EXISTS warehouse.dim_products (
     sub_category VARCHAR(50),
     brand VARCHAR(50),
     price_range VARCHAR(20),
+    attribute_hash CHAR(32),
     effective_date DATE,
     end_date DATE,
     is_current BOOLEAN
@@ -70,19 +77,30 @@ CREATE TABLE IF NOT EXISTS warehouse.dim_products (
 -- FACT: SALES
 -- =========================
 CREATE TABLE IF NOT EXISTS warehouse.fact_sales (
-    sales_key BIGSERIAL PRIMARY KEY,
+    sales_key BIGSERIAL,
     date_key INTEGER REFERENCES warehouse.dim_date(date_key),
     customer_key INTEGER REFERENCES warehouse.dim_customers(customer_key),
     product_key INTEGER REFERENCES warehouse.dim_products(product_key),
     payment_method_key INTEGER REFERENCES warehouse.dim_payment_method(payment_method_key),
     transaction_id VARCHAR(20),
+    item_id VARCHAR(20),
     quantity INTEGER,
     unit_price DECIMAL(12,2),
     discount_amount DECIMAL(12,2),
     line_total DECIMAL(12,2),
     profit DECIMAL(12,2),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (sales_key, date_key),
+    -- One row per line item; probed by the incremental load's anti-join
+    UNIQUE (item_id, date_key)
+) PARTITION BY RANGE (date_key);
+
+-- Tells the aggregate merge whether a transaction was already counted
+CREATE INDEX IF NOT EXISTS idx_fact_sales_transaction
+    ON warehouse.fact_sales(transaction_id, date_key);
+
+-- Monthly partitions (fact_sales_pYYYYMM, bounds YYYYMM01) are created by
+-- scripts/transformation/partitions.py during the warehouse load
 
 -- =========================
 -- AGGREGATES
@@ -107,5 +125,102 @@ CREATE TABLE IF NOT EXISTS warehouse.agg_customer_metrics (
     total_transactions INTEGER,
     total_spent DECIMAL(14,2),
     avg_order_value DECIMAL(14,2),
-    last_purchase_date DATE
+    last_purchase_date DATE,
+    -- Running count behind avg_order_value (total_spent / line_item_count)
+    line_item_count INTEGER
+);
+
+-- =========================
+-- LOAD WATERMARKS
+-- =========================
+-- Last sales_key / item number merged into fact_sales and each aggregate.
+-- Kept here rather than in production.load_watermarks, which the
+-- production DDL recreates while these tables keep their rows.
+CREATE TABLE IF NOT EXISTS warehouse.load_watermarks (
+    table_name VARCHAR(100) PRIMARY KEY,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    last_loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =========================
+-- REPORTING VIEWS
+-- =========================
+-- Aggregates joined to their dimensions for BI tools. Refreshed with
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY by
+-- scripts/transformation/refresh_views.py, so readers never block and
+-- never see a half-built state. Each needs a unique index to allow it.
+CREATE MATERIALIZED VIEW IF NOT EXISTS warehouse.mv_daily_sales AS
+SELECT
+    a.date_key,
+    d.full_date,
+    d.year,
+    d.quarter,
+    d.month,
+    d.day_name,
+    d.is_weekend,
+    d.fiscal_year,
+    d.fiscal_quarter,
+    d.is_holiday,
+    a.total_transactions,
+    a.total_revenue,
+    a.total_profit,
+    a.unique_customers
+FROM warehouse.agg_daily_sales a
+JOIN warehouse.dim_date d ON d.date_key = a.date_key;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_daily_sales
+    ON warehouse.mv_daily_sales(date_key);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS warehouse.mv_product_performance AS
+SELECT
+    a.product_key,
+    p.product_id,
+    p.product_name,
+    p.category,
+    p.sub_category,
+    p.brand,
+    p.price_range,
+    p.is_current,
+    a.total_quantity_sold,
+    a.total_revenue,
+    a.total_profit
+FROM warehouse.agg_product_performance a
+JOIN warehouse.dim_products p ON p.product_key = a.product_key;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_product_performance
+    ON warehouse.mv_product_performance(product_key);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS warehouse.mv_customer_metrics AS
+SELECT
+    a.customer_key,
+    c.customer_id,
+    c.full_name,
+    c.city,
+    c.state,
+    c.age_group,
+    c.is_current,
+    a.total_transactions,
+    a.total_spent,
+    a.avg_order_value,
+    a.last_purchase_date
+FROM warehouse.agg_customer_metrics a
+JOIN warehouse.dim_customers c ON c.customer_key = a.customer_key;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_customer_metrics
+    ON warehouse.mv_customer_metrics(customer_key);
+
+-- One row per view refresh: timing, and the aggregate load it reflects
+CREATE TABLE IF NOT EXISTS warehouse.mv_refresh_log (
+    refresh_id BIGSERIAL PRIMARY KEY,
+    view_name VARCHAR(100) NOT NULL,
+    refresh_mode VARCHAR(20),
+    started_at TIMESTAMP NOT NULL,
+    duration_seconds DECIMAL(10,3),
+    row_count BIGINT,
+    -- Latest warehouse.load_watermarks.last_loaded_at of the view's aggregate
+    -- and dimensions at refresh time
+    source_loaded_at TIMESTAMP
 );
+
+CREATE INDEX IF NOT EXISTS idx_mv_refresh_log_view
+    ON warehouse.mv_refresh_log(view_name, started_at);
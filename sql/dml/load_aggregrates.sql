@@ -10,14 +10,16 @@ INSERT INTO warehouse.agg_customer_metrics (
     total_transactions,
     total_spent,
     avg_order_value,
-    last_purchase_date
+    last_purchase_date,
+    line_item_count
 )
 SELECT
     fs.customer_key,
     COUNT(DISTINCT fs.transaction_id),
     SUM(fs.line_total),
     AVG(fs.line_total),
-    MAX(d.full_date)
+    MAX(d.full_date),
+    COUNT(*)
 FROM warehouse.fact_sales fs
 JOIN warehouse.dim_date d
     ON fs.date_key = d.date_key
@@ -82,9 +82,11 @@ FROM staging.transactions;
 -- ----------------------------
 -- 4️⃣ TRANSACTION ITEMS
 -- ----------------------------
+-- transaction_date (partition key) comes from the parent transaction
 INSERT INTO production.transaction_items (
     item_id,
     transaction_id,
+    transaction_date,
     product_id,
     quantity,
     unit_price,
@@ -92,13 +94,16 @@ INSERT INTO production.transaction_items (
     line_total
 )
 SELECT
-    item_id,
-    transaction_id,
-    product_id,
-    quantity,
-    unit_price,
-    discount_percentage,
-    line_total
-FROM staging.transaction_items;
+    ti.item_id,
+    ti.transaction_id,
+    t.transaction_date,
+    ti.product_id,
+    ti.quantity,
+    ti.unit_price,
+    ti.discount_percentage,
+    ti.line_total
+FROM staging.transaction_items ti
+JOIN staging.transactions t
+    ON t.transaction_id = ti.transaction_id;
 
 COMMIT;
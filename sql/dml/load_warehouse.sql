@@ -85,12 +85,16 @@ ON CONFLICT (date_key) DO NOTHING;
 -- ============================
 -- FACT SALES (FINAL VERSION)
 -- ============================
+-- Same rows as build_fact_sales in scripts/transformation/load_warehouse.py:
+-- one row per line item, customer/product keys of the SCD version in
+-- effect on the transaction date, items already loaded skipped
 INSERT INTO warehouse.fact_sales (
     date_key,
     customer_key,
     product_key,
     payment_method_key,
     transaction_id,
+    item_id,
     quantity,
     unit_price,
     discount_amount,
@@ -98,26 +102,36 @@ INSERT INTO warehouse.fact_sales (
     profit
 )
 SELECT
-    TO_CHAR(t.transaction_date, 'YYYYMMDD')::INT         AS date_key,
+    dd.date_key                                         AS date_key,
     dc.customer_key                                     AS customer_key,
     dp.product_key                                      AS product_key,
     pm.payment_method_key                               AS payment_method_key,
     ti.transaction_id,
+    ti.item_id,
     ti.quantity,
     ti.unit_price,
-    (ti.unit_price * ti.quantity * ti.discount_percentage / 100) AS discount_amount,
+    ROUND(ti.unit_price * ti.quantity * (ti.discount_percentage / 100.0), 2) AS discount_amount,
     ti.line_total,
-    ti.line_total                                       AS profit
+    ti.line_total - (p.cost * ti.quantity)              AS profit
 FROM production.transaction_items ti
 JOIN production.transactions t
     ON ti.transaction_id = t.transaction_id
+   AND ti.transaction_date = t.transaction_date
+JOIN production.products p
+    ON p.product_id = ti.product_id
 JOIN warehouse.dim_customers dc
     ON dc.customer_id = t.customer_id
+   AND t.transaction_date >= dc.effective_date
+   AND (dc.end_date IS NULL OR t.transaction_date < dc.end_date)
 JOIN warehouse.dim_products dp
-  ON dp.product_id = ti.product_id
- AND dp.is_current = TRUE
+    ON dp.product_id = ti.product_id
+   AND t.transaction_date >= dp.effective_date
+   AND (dp.end_date IS NULL OR t.transaction_date < dp.end_date)
 JOIN warehouse.dim_payment_method pm
-    ON pm.payment_method_name = t.payment_method;
+    ON pm.payment_method_name = t.payment_method
+JOIN warehouse.dim_date dd
+    ON dd.full_date = t.transaction_date
+ON CONFLICT (item_id, date_key) DO NOTHING;
 
 
 COMMIT;
@@ -1,19 +1,9 @@
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.engine import URL
-import os
+from scripts.db import get_engine
 
 @pytest.fixture(scope="session")
 def db_engine():
-    url = URL.create(
-        drivername="postgresql+psycopg2",
-        username=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=int(os.getenv("DB_PORT")),
-        database=os.getenv("DB_NAME"),
-    )
-    engine = create_engine(url)
+    engine = get_engine("pytest")
     yield engine
     engine.dispose()
 import subprocess
@@ -1,7 +1,14 @@
 import pandas as pd
 import os
 import re
-from scripts.data_generation.generate_data import generate_all_data
+from scripts.data_generation import generate_data as gen
+from scripts.data_generation.generate_data import (
+    generate_all_data,
+    generate_incremental_data,
+    generate_sharded_data,
+    read_metadata,
+)
+from scripts.schemas import read_csv
 
 
 DATA_DIR = "data/raw"
@@ -11,25 +18,25 @@ def test_csv_files_exist():
         assert os.path.exists(f"{DATA_DIR}/{f}")
 
 def test_customers_schema():
-    df = pd.read_csv(f"{DATA_DIR}/customers.csv")
+    df = read_csv(f"{DATA_DIR}/customers.csv", "customers")
     required = ["customer_id", "email", "registration_date"]
     for col in required:
         assert col in df.columns
     assert df["customer_id"].isnull().sum() == 0
 
 def test_email_format():
-    df = pd.read_csv(f"{DATA_DIR}/customers.csv")
+    df = read_csv(f"{DATA_DIR}/customers.csv", "customers")
     pattern = re.compile(r".+@.+\..+")
     assert df["email"].apply(lambda x: bool(pattern.match(x))).all()
 
 def test_referential_integrity():
-    cust = pd.read_csv(f"{DATA_DIR}/customers.csv")
-    txn = pd.read_csv(f"{DATA_DIR}/transactions.csv")
+    cust = read_csv(f"{DATA_DIR}/customers.csv", "customers")
+    txn = read_csv(f"{DATA_DIR}/transactions.csv", "transactions")
     assert txn["customer_id"].isin(cust["customer_id"]).all()
 
 def test_line_total_calculation():
     generate_all_data() 
-    items = pd.read_csv(f"{DATA_DIR}/transaction_items.csv")
+    items = read_csv(f"{DATA_DIR}/transaction_items.csv", "transaction_items")
 
     calc = (
         items["quantity"]
@@ -39,3 +46,129 @@ def test_line_total_calculation():
 
     assert (items["line_total"].round(2) == calc).all()
 
+def test_transaction_total_matches_items():
+    txn = read_csv(f"{DATA_DIR}/transactions.csv", "transactions")
+    items = read_csv(f"{DATA_DIR}/transaction_items.csv", "transaction_items")
+
+    totals = items.groupby("transaction_id")["line_total"].sum().round(2)
+    merged = txn.set_index("transaction_id")["total_amount"].round(2)
+
+    assert (totals.reindex(merged.index) - merged).abs().max() < 0.01
+
+def test_sharded_generation_is_reproducible(tmp_path):
+    runs = []
+    for run in ("a", "b"):
+        out = tmp_path / run
+        generate_sharded_data(3, seed=42, output_dir=str(out), workers=2)
+        runs.append({
+            f: (out / f).read_bytes()
+            for f in ["customers.csv", "products.csv", "transactions.csv", "transaction_items.csv"]
+        })
+
+    assert runs[0] == runs[1]
+
+    items = read_csv(tmp_path / "a" / "transaction_items.csv", "transaction_items")
+    assert items["item_id"].is_unique
+
+def test_streamed_batches_keep_ids_contiguous(tmp_path):
+    generate_all_data(output_dir=str(tmp_path), seed=1, batch_size=777)
+
+    txn = read_csv(tmp_path / "transactions.csv", "transactions")
+    items = read_csv(tmp_path / "transaction_items.csv", "transaction_items")
+
+    assert txn["transaction_id"].is_unique
+    assert items["item_id"].is_unique
+    assert items["transaction_id"].isin(txn["transaction_id"]).all()
+
+def test_parquet_output_is_partitioned_by_month(tmp_path):
+    generate_all_data(output_dir=str(tmp_path), seed=1, output_format="parquet")
+
+    assert (tmp_path / "customers.parquet").exists()
+    months = {p.name for p in (tmp_path / "transactions").iterdir()}
+    assert "transaction_month=2023-01" in months
+
+    txn = pd.read_parquet(tmp_path / "transactions")
+    items = pd.read_parquet(tmp_path / "transaction_items")
+    txn_month = txn.set_index("transaction_id")["transaction_month"].astype(str)
+
+    assert (items["transaction_month"].astype(str).to_numpy()
+            == txn_month.loc[items["transaction_id"]].to_numpy()).all()
+
+def test_incremental_run_continues_id_sequences(tmp_path):
+    generate_all_data(output_dir=str(tmp_path), seed=1)
+    before = read_metadata(str(tmp_path))
+
+    generate_incremental_data(output_dir=str(tmp_path), batch_date="2025-01-01", seed=2)
+    after = read_metadata(str(tmp_path))
+
+    txn = read_csv(tmp_path / "transactions.csv", "transactions")
+    cust = read_csv(tmp_path / "customers.csv", "customers")
+
+    assert (txn["transaction_date"] == "2025-01-01").all()
+    assert txn["transaction_id"].iloc[0] == f"TXN{before['num_transactions'] + 1:05d}"
+    assert after["num_transactions"] == before["num_transactions"] + len(txn)
+    assert txn["customer_id"].isin(cust["customer_id"]).all()
+
+def test_incremental_run_without_churn(tmp_path, monkeypatch):
+    monkeypatch.setattr(gen, "CUSTOMER_CHURN_RATE", 0)
+    monkeypatch.setattr(gen, "PRODUCT_CHURN_RATE", 0)
+
+    for output_format in ["csv", "parquet"]:
+        output_dir = str(tmp_path / output_format)
+        generate_all_data(output_dir=output_dir, seed=1, output_format=output_format)
+        before = gen.read_metadata(output_dir)
+
+        gen.generate_incremental_data(output_dir=output_dir, batch_date="2025-01-01", seed=2)
+        after = gen.read_metadata(output_dir)
+
+        assert after["num_customers"] == before["num_customers"]
+        assert after["num_products"] == before["num_products"]
+        assert after["num_transactions"] > before["num_transactions"]
+
+def test_incremental_run_keeps_customer_addresses(tmp_path):
+    generate_all_data(output_dir=str(tmp_path), seed=1)
+    full = read_csv(tmp_path / "transactions.csv", "transactions")
+
+    generate_incremental_data(output_dir=str(tmp_path), batch_date="2025-01-01", seed=2)
+    batch = read_csv(tmp_path / "transactions.csv", "transactions")
+
+    address = full.groupby("customer_id")["shipping_address"].agg(set)
+    assert (address.map(len) == 1).all()
+
+    returning = batch[batch["customer_id"].isin(address.index)]
+    assert len(returning) > 0
+    assert (returning["shipping_address"].to_numpy()
+            == address.loc[returning["customer_id"]].map(min).to_numpy()).all()
+
+    # New customers get the address a full run would have given them
+    everyone = gen.build_addresses(read_metadata(str(tmp_path))["num_customers"])
+    assert (gen.build_addresses(10, first_id=41) == everyone[40:50]).all()
+
+def test_value_pools_are_cached_on_disk(tmp_path):
+    pools = gen.load_value_pools(seed=5, size=50, cache_dir=str(tmp_path))
+    cached = list(tmp_path.glob("faker_pools_*_seed5_n50.npz"))
+    assert len(cached) == 1
+
+    gen._value_pools.clear()
+    reloaded = gen.load_value_pools(seed=5, size=50, cache_dir=str(tmp_path))
+    assert all((pools[k] == reloaded[k]).all() for k in pools)
+    assert len(pools["city"]) == 50
+
+def test_skewed_profile_concentrates_products(tmp_path):
+    generate_all_data(output_dir=str(tmp_path), seed=1, profile="skewed")
+    items = read_csv(tmp_path / "transaction_items.csv", "transaction_items")
+
+    top_share = items["product_id"].value_counts(normalize=True).iloc[0]
+    # uniform sampling over 500 products would give roughly 0.2% each
+    assert top_share > 0.05
+
+def test_schema_registry_reads_compact_dtypes():
+    items = read_csv(f"{DATA_DIR}/transaction_items.csv", "transaction_items")
+    txn = read_csv(f"{DATA_DIR}/transactions.csv", "transactions")
+
+    assert items["quantity"].dtype == "Int16"
+    assert isinstance(txn["payment_method"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(txn["transaction_date"])
+
+    inferred = pd.read_csv(f"{DATA_DIR}/transactions.csv", dtype=object)
+    assert txn.memory_usage(deep=True).sum() < inferred.memory_usage(deep=True).sum()
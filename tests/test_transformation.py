@@ -1,5 +1,9 @@
 import pandas as pd
-from scripts.transformation.staging_to_production import run_staging_to_production
+from datetime import date
+from sqlalchemy import event, text
+from scripts import catalog
+from scripts.transformation import partitions
+from scripts.transformation.staging_to_production import run_staging_to_production, upsert_from_staging
 
 def test_production_tables_populated(db_engine):
     with db_engine.connect() as conn:
@@ -16,3 +20,138 @@ def test_idempotency(db_engine):
         c1 = pd.read_sql("SELECT COUNT(*) cnt FROM production.customers", conn).iloc[0]["cnt"]
         c2 = pd.read_sql("SELECT COUNT(*) cnt FROM production.customers", conn).iloc[0]["cnt"]
     assert c1 == c2
+
+def test_sql_mode_is_idempotent(db_engine):
+    run_staging_to_production(mode="sql")
+    counts = run_staging_to_production(mode="sql")
+
+    with db_engine.connect() as conn:
+        items = pd.read_sql("SELECT COUNT(*) cnt FROM production.transaction_items", conn)
+
+    assert counts["transactions"] == 0
+    assert counts["transaction_items"] == 0
+    assert items.iloc[0]["cnt"] > 0
+
+def test_fact_watermarks_track_loaded_ids(db_engine):
+    run_staging_to_production(mode="sql")
+
+    with db_engine.connect() as conn:
+        marks = pd.read_sql(
+            "SELECT table_name, last_id FROM production.load_watermarks", conn
+        ).set_index("table_name")["last_id"]
+        max_txn = pd.read_sql(
+            "SELECT MAX(CAST(SUBSTRING(transaction_id FROM '[0-9]+$') AS BIGINT)) m "
+            "FROM production.transactions",
+            conn,
+        ).iloc[0]["m"]
+
+    assert marks["transactions"] == max_txn
+
+def test_staging_reload_below_watermark_is_not_skipped(db_engine):
+    run_staging_to_production(mode="sql")
+
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            # Production is ahead of staging, and one staged row is missing
+            conn.execute(text(
+                "UPDATE production.load_watermarks SET last_id = last_id + 1000000 "
+                "WHERE table_name = 'transactions'"
+            ))
+            txn_id = conn.execute(text(
+                "SELECT MIN(transaction_id) FROM staging.transactions"
+            )).scalar()
+            conn.execute(text("DELETE FROM production.transaction_items WHERE transaction_id = :t"), {"t": txn_id})
+            conn.execute(text("DELETE FROM production.transactions WHERE transaction_id = :t"), {"t": txn_id})
+
+            loaded = upsert_from_staging("transactions", conn)
+        finally:
+            trans.rollback()
+
+    assert loaded == 1
+
+def test_unchanged_dimensions_are_not_rewritten(db_engine):
+    run_staging_to_production(mode="sql")
+    counts = run_staging_to_production(mode="sql")
+
+    for table in ["customers", "products"]:
+        assert counts[table]["inserted"] == 0
+        assert counts[table]["updated"] == 0
+        assert counts[table]["unchanged"] > 0
+
+def test_connections_report_application_name(db_engine):
+    with db_engine.connect() as conn:
+        name = pd.read_sql("SELECT current_setting('application_name') n", conn)
+    assert name.iloc[0]["n"] == "pytest"
+
+def test_catalog_serves_metadata_from_one_query(db_engine):
+    catalog.invalidate()
+    statements = []
+    with db_engine.connect() as conn:
+        event.listen(conn, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        pk = catalog.get_primary_key("production.customers", conn)
+        cols = catalog.get_columns("staging.transactions", conn)
+        types = catalog.get_column_types("warehouse.fact_sales", conn)
+
+    assert pk == ["customer_id"]
+    assert "transaction_id" in cols
+    assert "line_total" in types
+    assert len(statements) == 1
+
+def test_partitions_attach_and_detach_by_month(db_engine):
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            created = partitions.ensure_partitions(
+                "warehouse.fact_sales", date(2031, 1, 15), date(2031, 2, 3), conn, months_ahead=0
+            )
+            detached = partitions.detach_partitions_before(
+                "warehouse.fact_sales", date(2031, 2, 1), conn, action="drop"
+            )
+        finally:
+            trans.rollback()
+
+    assert created == ["warehouse.fact_sales_p203101", "warehouse.fact_sales_p203102"]
+    assert "warehouse.fact_sales_p203101" in detached
+    assert "warehouse.fact_sales_p203102" not in detached
+
+def test_retention_keeps_detached_transaction_partitions(db_engine):
+    tables = ["production.transactions", "production.transaction_items"]
+
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            for table in tables:
+                partitions.ensure_partitions(table, date(2019, 1, 1), date(2019, 1, 1), conn, months_ahead=0)
+            conn.execute(text("""
+                INSERT INTO production.transactions
+                    (transaction_id, customer_id, transaction_date, transaction_time)
+                SELECT 'TXN_RETENTION', MIN(customer_id), DATE '2019-01-15', TIME '12:00'
+                FROM production.customers
+            """))
+            conn.execute(text("""
+                INSERT INTO production.transaction_items
+                    (item_id, transaction_id, transaction_date, product_id, quantity)
+                SELECT 'ITEM_RETENTION', 'TXN_RETENTION', DATE '2019-01-15', MIN(product_id), 1
+                FROM production.products
+            """))
+
+            detached = partitions.apply_retention(tables, conn, retention_months=1, today=date(2019, 3, 10))
+            archived = conn.execute(text(
+                "SELECT COUNT(*) FROM production.transaction_items_p201901"
+            )).scalar()
+            foreign_keys = conn.execute(text("""
+                SELECT COUNT(*) FROM pg_constraint
+                WHERE conrelid = 'production.transaction_items_p201901'::regclass AND contype = 'f'
+            """)).scalar()
+            reattached = partitions.ensure_partitions(
+                "production.transactions", date(2019, 1, 1), date(2019, 2, 1), conn,
+                months_ahead=0, retention_months=1, today=date(2019, 3, 10),
+            )
+        finally:
+            trans.rollback()
+
+    assert detached == ["production.transaction_items_p201901", "production.transactions_p201901"]
+    assert archived == 1
+    assert foreign_keys == 0
+    assert reattached == ["production.transactions_p201902"]
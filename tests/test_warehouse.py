@@ -1,4 +1,23 @@
+import json
 import pandas as pd
+from sqlalchemy import text
+from scripts.transformation.date_dimension import date_rows, ensure_dates
+from scripts.transformation.load_warehouse import (
+    AGGREGATE_TABLES,
+    build_aggregates,
+    build_dim_customers,
+    build_dim_payment_method,
+    build_dim_products,
+    build_fact_sales,
+    load_stages,
+    run_warehouse_load,
+)
+from scripts.transformation.refresh_views import (
+    VIEWS,
+    refresh_view,
+    run_refresh,
+    view_staleness,
+)
 
 def test_fact_dimension_relationships(db_engine):
     with db_engine.connect() as conn:
@@ -20,3 +39,221 @@ def test_aggregate_consistency(db_engine):
 
     assert fact.iloc[0]["total"] >= 0
 
+
+def test_payment_methods_upsert_in_place(db_engine):
+    keys = "SELECT payment_method_name, payment_method_key FROM warehouse.dim_payment_method ORDER BY 1"
+
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        build_dim_payment_method(conn)
+        before = conn.execute(text(keys)).all()
+        conn.execute(text(
+            "UPDATE warehouse.dim_payment_method SET payment_type = 'Changed' WHERE payment_method_name = 'UPI'"
+        ))
+        fixed = build_dim_payment_method(conn)
+        rerun = build_dim_payment_method(conn)
+        after = conn.execute(text(keys)).all()
+        trans.rollback()
+
+    assert fixed == 1
+    assert rerun == 0
+    assert len(after) == 5
+    assert after == before
+
+def test_scd2_versions_only_changed_rows(db_engine):
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        build_dim_customers(conn)
+        customer_id = conn.execute(text(
+            "SELECT customer_id FROM warehouse.dim_customers WHERE is_current LIMIT 1"
+        )).scalar()
+        before = conn.execute(text(
+            "SELECT COUNT(*) FROM warehouse.dim_customers"
+        )).scalar()
+
+        conn.execute(
+            text("UPDATE production.customers SET city = 'Changed City' WHERE customer_id = :c"),
+            {"c": customer_id},
+        )
+        changed = build_dim_customers(conn)
+        versions = conn.execute(
+            text("""
+                SELECT city, is_current, end_date
+                FROM warehouse.dim_customers
+                WHERE customer_id = :c
+                ORDER BY customer_key
+            """),
+            {"c": customer_id},
+        ).all()
+        after = conn.execute(text(
+            "SELECT COUNT(*) FROM warehouse.dim_customers"
+        )).scalar()
+        rerun = build_dim_customers(conn)
+        trans.rollback()
+
+    assert changed["inserted"] == 1 and changed["closed"] == 1
+    assert after == before + 1
+    assert not versions[-2].is_current and versions[-2].end_date is not None
+    assert versions[-1].city == "Changed City" and versions[-1].is_current
+    assert rerun["inserted"] == 0 and rerun["closed"] == 0
+
+def test_legacy_dimension_rows_still_match_historical_facts(db_engine):
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        # Dimensions as the old full refresh left them: one version per
+        # key, effective from the load day, no attribute hash
+        conn.execute(text("TRUNCATE warehouse.fact_sales"))
+        for dim in ["dim_customers", "dim_products"]:
+            conn.execute(text(f"DELETE FROM warehouse.{dim} WHERE NOT is_current"))
+            conn.execute(text(f"""
+                UPDATE warehouse.{dim}
+                SET attribute_hash = NULL, effective_date = CURRENT_DATE, end_date = NULL
+            """))
+
+        build_dim_customers(conn)
+        build_dim_products(conn)
+        loaded = build_fact_sales(conn, mode="full")
+        items = conn.execute(text("SELECT COUNT(*) FROM production.transaction_items")).scalar()
+        first_dates = conn.execute(text("""
+            SELECT DISTINCT effective_date FROM warehouse.dim_customers
+            WHERE effective_date < CURRENT_DATE
+        """)).scalars().all()
+        trans.rollback()
+
+    assert loaded == items
+    assert [str(d) for d in first_dates] == ["1900-01-01"]
+
+def test_incremental_fact_load_matches_full_rebuild(db_engine):
+    snapshot = "SELECT COUNT(*), SUM(line_total), COUNT(DISTINCT item_id) FROM warehouse.fact_sales"
+
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        build_fact_sales(conn, mode="incremental")
+        rerun = build_fact_sales(conn, mode="incremental")
+        incremental = conn.execute(text(snapshot)).one()
+        rebuilt = build_fact_sales(conn, mode="full")
+        full = conn.execute(text(snapshot)).one()
+        trans.rollback()
+
+    assert rerun == 0
+    assert rebuilt == full[0]
+    assert incremental == full
+    assert full[0] == full[2]
+
+def test_aggregate_delta_merge_matches_full_recompute(db_engine):
+    def snapshot(conn):
+        return {
+            table: conn.execute(text(f"SELECT * FROM {table} ORDER BY 1")).all()
+            for table in AGGREGATE_TABLES
+        }
+
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        build_fact_sales(conn, mode="full")
+
+        # Aggregate the older half, then load the rest as a new batch
+        conn.execute(text("""
+            DELETE FROM warehouse.fact_sales
+            WHERE item_id > (SELECT percentile_disc(0.5) WITHIN GROUP (ORDER BY item_id)
+                             FROM warehouse.fact_sales)
+        """))
+        conn.execute(text(
+            "DELETE FROM warehouse.load_watermarks WHERE table_name = 'warehouse.fact_sales'"
+        ))
+        build_aggregates(conn, full_refresh=True)
+        assert build_fact_sales(conn, mode="incremental") > 0
+
+        build_aggregates(conn)
+        merged = snapshot(conn)
+        build_aggregates(conn, full_refresh=True)
+        recomputed = snapshot(conn)
+        trans.rollback()
+
+    assert merged == recomputed
+
+def test_aggregate_without_watermark_is_rebuilt(db_engine):
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        build_fact_sales(conn, mode="incremental")
+        build_aggregates(conn)
+        expected = conn.execute(text("SELECT SUM(total_revenue) FROM warehouse.agg_daily_sales")).scalar()
+
+        # Rows kept, watermark lost (e.g. the watermark table was recreated)
+        conn.execute(text(
+            "DELETE FROM warehouse.load_watermarks WHERE table_name = 'warehouse.agg_daily_sales'"
+        ))
+        build_aggregates(conn)
+        total = conn.execute(text("SELECT SUM(total_revenue) FROM warehouse.agg_daily_sales")).scalar()
+        trans.rollback()
+
+    assert total == expected
+
+def test_warehouse_load_graph_reports_every_node():
+    nodes = [name for stage in load_stages() for name in stage]
+
+    for mode in ["parallel", "atomic"]:
+        report = run_warehouse_load(mode=mode)
+        assert list(report["nodes"]) == nodes
+        assert all(node["status"] == "success" for node in report["nodes"].values())
+
+    with open("data/processed/warehouse_load_report.json") as f:
+        written = json.load(f)
+    assert written["mode"] == "atomic"
+    assert written["nodes"]["fact_sales"]["duration_seconds"] >= 0
+
+def test_dim_date_covers_every_transaction_date(db_engine):
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        ensure_dates(conn)
+        rerun = ensure_dates(conn)
+        missing = conn.execute(text("""
+            SELECT COUNT(*)
+            FROM production.transactions t
+            LEFT JOIN warehouse.dim_date d ON d.full_date = t.transaction_date
+            WHERE d.date_key IS NULL
+        """)).scalar()
+        trans.rollback()
+
+    assert rerun == 0
+    assert missing == 0
+
+    days = date_rows("2024-03-31", "2024-04-01").set_index("date_key")
+    assert days.loc[20240331, ["fiscal_year", "fiscal_quarter", "fiscal_month"]].tolist() == [2024, 4, 12]
+    assert days.loc[20240401, ["fiscal_year", "fiscal_quarter", "fiscal_month"]].tolist() == [2025, 1, 1]
+    assert date_rows("2024-01-26", "2024-01-26").iloc[0]["is_holiday"]
+
+def test_reporting_views_refresh_concurrently(db_engine):
+    run_warehouse_load()
+    run_refresh()
+    report = run_refresh()
+
+    # A load that merges nothing new leaves the views current
+    run_warehouse_load()
+
+    with db_engine.connect() as conn:
+        staleness = view_staleness(conn)
+        for view, source in VIEWS.items():
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM {source}")).scalar()
+            assert report["views"][view]["row_count"] == rows
+            assert report["views"][view]["refresh_mode"] == "concurrent"
+            assert not staleness[view]["is_stale"]
+
+def test_dimension_change_marks_views_stale(db_engine):
+    run_refresh()
+    view = "warehouse.mv_customer_metrics"
+
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        conn.execute(text("""
+            UPDATE production.customers SET city = 'Changed City'
+            WHERE customer_id = (SELECT MIN(customer_id) FROM production.customers)
+        """))
+        build_dim_customers(conn)
+        changed = view_staleness(conn)
+        refresh_view(view, conn)
+        refreshed = view_staleness(conn)
+        trans.rollback()
+
+    assert changed[view]["is_stale"]
+    assert not changed["warehouse.mv_daily_sales"]["is_stale"]
+    assert not refreshed[view]["is_stale"]